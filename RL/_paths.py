@@ -0,0 +1,12 @@
+"""Make the repository root importable so ``TE`` can be imported from ``RL/``.
+
+The scripts in ``RL/`` are run from this directory; import this module
+before ``from TE... import ...``.
+"""
+
+import os
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
@@ -1,13 +1,33 @@
 import os
 import numpy as np
 import random
-from collections import deque
+import threading
 import tensorflow as tf
-from utils import STATE_SIZE, ACTION_SIZE
+
+import _paths  # noqa: F401  (puts the repository root on sys.path)
+from TE.TE import dense_forward
+from utils import (
+    STATE_SIZE, DRIVE_ACTIONS, AGENT_CAMERA_ANGLES, OUTPUT_SIZE, action_index, split_action,
+)
+from config import (
+    FACTORIZED_ACTIONS, BATCH_SIZE, REPLAY_UPDATES, MEMORY_SIZE, PRIORITIZED_REPLAY, PER_ALPHA, PER_BETA, PER_BETA_STEPS,
+)
+from replay_buffer import ReplayBuffer, PrioritizedReplayBuffer
 
 class DQNAgent:
-    def __init__(self, model_path=None):
-        self.memory = deque(maxlen=2000)
+    def __init__(self, model_path=None, batch_size=BATCH_SIZE, updates=REPLAY_UPDATES,
+                 memory_size=MEMORY_SIZE, prioritized=PRIORITIZED_REPLAY):
+        if prioritized:
+            self.memory = PrioritizedReplayBuffer(
+                memory_size, STATE_SIZE, PER_ALPHA, PER_BETA, PER_BETA_STEPS
+            )
+        else:
+            self.memory = ReplayBuffer(memory_size, STATE_SIZE)
+        self.batch_size = batch_size
+        self.updates = updates
+        # Allow a learner thread to train while another thread acts
+        self.memory_lock = threading.Lock()
+        self.model_lock = threading.Lock()
         self.gamma = 0.95
         self.epsilon = 1.0
         self.epsilon_min = 0.01
@@ -18,48 +38,146 @@ class DQNAgent:
                 self.model = tf.keras.models.load_model(model_path)
             except Exception:
                 self.model = self._build_model()
+            if self.model.output_shape[-1] != OUTPUT_SIZE:
+                # Saved for a different action representation
+                self.model = self._build_model()
         else:
             self.model = self._build_model()
         self.model_path = model_path
+        self._compile_train_step()
+        self.sync_weights()
 
     def _build_model(self):
         m = tf.keras.models.Sequential([
             tf.keras.layers.Dense(24, input_dim=STATE_SIZE, activation='relu'),
             tf.keras.layers.Dense(24, activation='relu'),
-            tf.keras.layers.Dense(ACTION_SIZE, activation='linear')
+            tf.keras.layers.Dense(OUTPUT_SIZE, activation='linear')
         ])
         m.compile(loss='mse', optimizer=tf.keras.optimizers.Adam(0.001))
         return m
 
+    def sync_weights(self):
+        """Copy the network weights used by :meth:`q_values`."""
+        with self.model_lock:
+            weights = self.model.get_weights()
+        self._layers = list(zip(weights[0::2], weights[1::2]))
+
+    def get_weights(self):
+        """Return the weights used by :meth:`act` in ``get_weights()`` order."""
+        return [array for layer in self._layers for array in layer]
+
+    def q_values(self, states):
+        """NumPy forward pass of the Dense/ReLU network.
+
+        Much cheaper than ``model.predict`` for single states.  Uses the
+        weights of the last :meth:`sync_weights` call.
+        """
+        return dense_forward(self._layers, states)
+
+    def _greedy(self, q):
+        """Indices into ``ACTIONS`` of the best actions for the outputs ``q``."""
+        if FACTORIZED_ACTIONS:
+            n = len(DRIVE_ACTIONS)
+            drive = np.argmax(q[..., :n], axis=-1)
+            camera = np.argmax(q[..., n:], axis=-1)
+        else:
+            drive, camera = np.divmod(np.argmax(q, axis=-1), len(AGENT_CAMERA_ANGLES))
+        return action_index(drive, camera)
+
     def act(self, state):
+        """Choose an action for one state, or an array of actions for a batch.
+
+        Actions are indices into ``ACTIONS``.
+        """
+        state = np.asarray(state, dtype=np.float32)
+        num_actions = len(DRIVE_ACTIONS) * len(AGENT_CAMERA_ANGLES)
+        if state.ndim > 1:
+            greedy = self._greedy(self.q_values(state))
+            explore = np.random.rand(len(state)) <= self.epsilon
+            drive, camera = np.divmod(
+                np.random.randint(num_actions, size=len(state)), len(AGENT_CAMERA_ANGLES)
+            )
+            return np.where(explore, action_index(drive, camera), greedy)
         if np.random.rand() <= self.epsilon:
-            return random.randrange(ACTION_SIZE)
-        q = self.model.predict(state[np.newaxis], verbose=0)[0]
-        return int(np.argmax(q))
+            return action_index(*divmod(random.randrange(num_actions), len(AGENT_CAMERA_ANGLES)))
+        return int(self._greedy(self.q_values(state)))
 
     def remember(self, s, a, r, s2, done):
-        self.memory.append((s, a, r, s2, done))
-
-    def replay(self, batch=32):
-        samples = random.sample(self.memory, min(len(self.memory), batch))
-        for s, a, r, s2, done in samples:
-            s = np.asarray(s)
-            s2 = np.asarray(s2)
-            target = r if done else r + self.gamma * np.max(
-                self.model.predict(s2[np.newaxis], verbose=0)[0]
+        with self.memory_lock:
+            self.memory.append(s, a, r, s2, done)
+
+    def _compile_train_step(self):
+        """Trace the training step for the current model."""
+        # Create the optimizer slots outside of the compiled function
+        self.model.optimizer.build(self.model.trainable_variables)
+        self._train_step = tf.function(self._train_step_fn)
+
+    def _train_step_fn(self, states, actions, rewards, next_states, dones, weights):
+        """One gradient step on a minibatch; returns the TD errors.
+
+        ``actions`` are indices into ``ACTIONS``.  With one output per action
+        the loss equals fitting the model to its own predictions with the
+        taken action's Q-value replaced by the TD target.  Factorized models
+        use the sum of the drive and camera values as Q-value.  Every sample
+        is scaled by its importance-sampling weight.
+        """
+        drive, camera = split_action(actions)
+        next_q = self.model(next_states, training=False)
+        if FACTORIZED_ACTIONS:
+            n = len(DRIVE_ACTIONS)
+            next_max = tf.reduce_max(next_q[:, :n], axis=1) + tf.reduce_max(next_q[:, n:], axis=1)
+            mask = tf.concat(
+                [tf.one_hot(drive, n), tf.one_hot(camera, len(AGENT_CAMERA_ANGLES))], axis=1
             )
-            q = self.model.predict(s[np.newaxis], verbose=0)
-            q[0][a] = target
-            self.model.fit(s[np.newaxis], q, epochs=1, verbose=0)
+        else:
+            next_max = tf.reduce_max(next_q, axis=1)
+            mask = tf.one_hot(drive * len(AGENT_CAMERA_ANGLES) + camera, OUTPUT_SIZE)
+        targets = rewards + self.gamma * next_max * (1.0 - dones)
+        with tf.GradientTape() as tape:
+            q = self.model(states, training=True)
+            td_errors = targets - tf.reduce_sum(q * mask, axis=1)
+            loss = tf.reduce_mean(weights * tf.square(td_errors)) / OUTPUT_SIZE
+        grads = tape.gradient(loss, self.model.trainable_variables)
+        self.model.optimizer.apply_gradients(zip(grads, self.model.trainable_variables))
+        return td_errors
+
+    def train_batch(self, batch=None):
+        """One gradient step on a sampled minibatch.
+
+        Returns ``False`` if the memory is empty.  The weights used by
+        :meth:`act` are not updated; call :meth:`sync_weights` for that.
+        """
+        with self.memory_lock:
+            batch = min(len(self.memory), batch or self.batch_size)
+            if not batch:
+                return False
+            *transitions, weights, idx = self.memory.sample(batch)
+        with self.model_lock:
+            td_errors = self._train_step(*transitions, weights).numpy()
+        with self.memory_lock:
+            self.memory.update_priorities(idx, td_errors)
+        return True
+
+    def decay_epsilon(self):
         if self.epsilon > self.epsilon_min:
             self.epsilon *= self.epsilon_decay
 
+    def replay(self, batch=None):
+        """Train on ``updates`` minibatches sampled from the memory."""
+        trained = False
+        for _ in range(self.updates):
+            trained = self.train_batch(batch)
+        if trained:
+            self.sync_weights()
+        self.decay_epsilon()
+
     def save(self, path=None):
         """Persist the current model to disk."""
         if path is None:
             path = self.model_path
         if path:
-            self.model.save(path)
+            with self.model_lock:
+                self.model.save(path)
 
     def load(self, path=None):
         """Load model weights from disk."""
@@ -68,3 +186,5 @@ class DQNAgent:
         if path and os.path.exists(path):
             self.model = tf.keras.models.load_model(path)
             self.model_path = path
+            self._compile_train_step()
+            self.sync_weights()
@@ -0,0 +1,169 @@
+"""Periodic checkpoints of a :class:`DQNAgent`.
+
+A checkpoint is one ``.npz`` file holding the network weights, the
+optimizer state, epsilon and the replay memory.  The training thread only
+copies these arrays; a background thread writes them to a temporary file
+and renames it into place, so an interrupted write never damages an
+existing checkpoint.  The newest ``keep`` checkpoints are kept.
+"""
+
+import os
+import queue
+import re
+import threading
+import time
+
+import numpy as np
+
+from config import CHECKPOINT_INTERVAL, CHECKPOINT_KEEP, CHECKPOINT_MEMORY
+
+CHECKPOINT_RE = re.compile(r"^ckpt-(\d+)\.npz$")
+
+
+def list_checkpoints(directory):
+    """Return the checkpoint files in ``directory`` from oldest to newest."""
+    if not os.path.isdir(directory):
+        return []
+    found = []
+    for name in os.listdir(directory):
+        match = CHECKPOINT_RE.match(name)
+        if match:
+            found.append((int(match.group(1)), os.path.join(directory, name)))
+    return [path for _, path in sorted(found)]
+
+
+def snapshot(agent, memory=True):
+    """Copy the state of ``agent`` into a dict of arrays.
+
+    With ``memory`` the replay memory is copied as well, which takes a few
+    milliseconds for a full buffer of ``MEMORY_SIZE`` transitions.
+    """
+    data = {}
+    with agent.model_lock:
+        for i, w in enumerate(agent.model.get_weights()):
+            data[f"model/{i}"] = w
+        for i, v in enumerate(agent.model.optimizer.variables):
+            data[f"optimizer/{i}"] = v.numpy()
+    if memory:
+        with agent.memory_lock:
+            for key, value in agent.memory.snapshot().items():
+                data[f"memory/{key}"] = value
+    data["epsilon"] = np.float64(agent.epsilon)
+    return data
+
+
+def restore(agent, path):
+    """Load the checkpoint at ``path`` into ``agent``.
+
+    Weights and optimizer state are skipped if they do not fit the agent's
+    network, e.g. after changing the action representation; epsilon and the
+    replay memory (if the checkpoint has one) are restored in any case.
+    """
+    with np.load(path) as f:
+        data = {key: f[key] for key in f.files}
+
+    def group(prefix):
+        keys = sorted((k for k in data if k.startswith(prefix)), key=lambda k: int(k[len(prefix):]))
+        return [data[k] for k in keys]
+
+    weights = group("model/")
+    slots = group("optimizer/")
+    with agent.model_lock:
+        if [w.shape for w in weights] == [w.shape for w in agent.model.get_weights()]:
+            agent.model.set_weights(weights)
+            variables = agent.model.optimizer.variables
+            if [s.shape for s in slots] == [tuple(v.shape) for v in variables]:
+                for v, value in zip(variables, slots):
+                    v.assign(value)
+    memory = {k[len("memory/"):]: v for k, v in data.items() if k.startswith("memory/")}
+    if memory:
+        with agent.memory_lock:
+            agent.memory.restore(memory)
+    agent.epsilon = float(data["epsilon"])
+    agent.sync_weights()
+
+
+class Checkpointer:
+    """Write checkpoints of ``agent`` to ``directory`` in the background.
+
+    :meth:`maybe_save` is cheap to call after every episode; it takes a
+    snapshot at most every ``interval`` seconds.  The snapshot is copied on
+    the calling thread, only the file is written in the background.  Copying
+    the replay memory dominates that cost; pass ``memory=False`` to
+    checkpoint only the network, optimizer and epsilon.  If the writer is
+    still busy, a pending snapshot is replaced by the newer one.
+    """
+
+    def __init__(self, agent, directory, interval=CHECKPOINT_INTERVAL, keep=CHECKPOINT_KEEP,
+                 memory=CHECKPOINT_MEMORY):
+        self.agent = agent
+        self.directory = directory
+        self.interval = interval
+        self.memory = memory
+        self.keep = max(1, keep)
+        existing = list_checkpoints(directory)
+        self.counter = int(CHECKPOINT_RE.match(os.path.basename(existing[-1])).group(1)) if existing else 0
+        self._last = time.monotonic()
+        self._pending = queue.Queue(maxsize=1)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def restore(self):
+        """Load the newest checkpoint; return its path or ``None``."""
+        existing = list_checkpoints(self.directory)
+        if not existing:
+            return None
+        restore(self.agent, existing[-1])
+        return existing[-1]
+
+    def maybe_save(self):
+        if time.monotonic() - self._last >= self.interval:
+            self.save()
+
+    def save(self):
+        """Snapshot the agent now and queue the snapshot for writing."""
+        self._last = time.monotonic()
+        self.counter += 1
+        item = (self.counter, snapshot(self.agent, self.memory))
+        while True:
+            try:
+                self._pending.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    self._pending.get_nowait()
+                except queue.Empty:
+                    pass
+
+    def _run(self):
+        while True:
+            item = self._pending.get()
+            if item is None:
+                return
+            try:
+                self._write(*item)
+            except Exception as e:
+                print(f"Checkpoint {item[0]} could not be written: {e!r}")
+
+    def _write(self, counter, data):
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"ckpt-{counter:08d}.npz")
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as fh:
+            np.savez(fh, **data)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp, path)
+        for old in list_checkpoints(self.directory)[:-self.keep]:
+            os.remove(old)
+
+    def close(self):
+        """Write a final checkpoint and wait for the writer to finish."""
+        self.save()
+        while self._thread.is_alive():
+            try:
+                self._pending.put(None, timeout=1.0)
+                break
+            except queue.Full:
+                pass
+        self._thread.join()
@@ -1,3 +1,54 @@
 BASE_URL = "http://127.0.0.1:5000"
 NUM_EPISODES = 1000
 MAX_STEPS = 1000
+# Number of simulator processes used by the [P]ool training mode
+NUM_WORKERS = 4
+# Run the [B]oth mode's training simulator in-process instead of via TE/TE.py
+DUAL_LOCAL = False
+# Display mirroring of the [B]oth mode: forward every Nth action to the
+# browser, at most MIRROR_MAX_HZ times per second (0 disables the limit)
+MIRROR_EVERY = 1
+MIRROR_MAX_HZ = 30
+MIRROR_QUEUE_SIZE = 4
+# Shared HTTP client: default timeout in seconds, retries of failed
+# connections and the initial backoff between them
+HTTP_TIMEOUT = 5
+HTTP_RETRIES = 2
+HTTP_BACKOFF = 0.05
+# Minibatch size and number of gradient steps per DQNAgent.replay call
+BATCH_SIZE = 32
+REPLAY_UPDATES = 1
+# Capacity of the replay memory in transitions (76 bytes each)
+MEMORY_SIZE = 100000
+# Prioritized experience replay: priority exponent and the importance
+# sampling exponent, annealed to 1 over PER_BETA_STEPS minibatches
+PRIORITIZED_REPLAY = False
+PER_ALPHA = 0.6
+PER_BETA = 0.4
+PER_BETA_STEPS = 100000
+# Action representation of the agent: choose the camera angle only every
+# CAMERA_STEP degrees and/or use separate drive and camera output heads
+# instead of one output per combination. Changing either starts a new model.
+CAMERA_STEP = 1
+FACTORIZED_ACTIONS = False
+# Train in a background thread while the environment is stepped. The
+# learner makes UPDATE_RATIO gradient steps per collected transition and
+# hands new weights to the acting policy every WEIGHT_SYNC_EVERY steps.
+ASYNC_LEARNER = False
+UPDATE_RATIO = 0.25
+WEIGHT_SYNC_EVERY = 50
+# [D]istributed mode: number of actor processes, their exploration rates
+# (ACTOR_EPSILON ** (1 + ACTOR_ALPHA * i / (NUM_ACTORS - 1)) for actor i) and
+# how many learner updates pass between two weight broadcasts
+NUM_ACTORS = 4
+ACTOR_EPSILON = 0.4
+ACTOR_ALPHA = 7
+WEIGHT_BROADCAST_EVERY = 100
+# Checkpoints of weights, optimizer state, epsilon and replay memory are
+# written in the background at most every CHECKPOINT_INTERVAL seconds; the
+# newest CHECKPOINT_KEEP files are kept. Copying the replay memory for a
+# checkpoint blocks training for a few milliseconds; set CHECKPOINT_MEMORY
+# to False to store only the network, optimizer state and epsilon.
+CHECKPOINT_INTERVAL = 60
+CHECKPOINT_KEEP = 3
+CHECKPOINT_MEMORY = True
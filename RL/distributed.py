@@ -0,0 +1,187 @@
+"""Actor processes feeding a central learner.
+
+Every actor process runs its own in-process simulator (:class:`LocalEnv`)
+and plays whole episodes with a NumPy copy of the network and a fixed
+epsilon of its own.  Finished episodes are sent to the learner through a
+queue as arrays.  The learner stores them in the agent's replay memory,
+trains and periodically publishes new weights in shared memory, which the
+actors pick up at the start of their next episode.
+"""
+
+import multiprocessing as mp
+import queue
+
+import numpy as np
+
+from config import (
+    NUM_ACTORS, ACTOR_EPSILON, ACTOR_ALPHA, WEIGHT_BROADCAST_EVERY, UPDATE_RATIO,
+    NUM_EPISODES, MAX_STEPS, CAMERA_STEP, FACTORIZED_ACTIONS,
+)
+from local_env import LocalEnv
+import _paths  # noqa: F401  (puts the repository root on sys.path)
+from TE.TE import DensePolicy
+from utils import ACTIONS, format_action, termination_reason
+
+MAPS = ["Level1.csv", "Level2.csv", "Level3.csv", "Level4.csv"]
+
+
+def actor_epsilons(num_actors, base=ACTOR_EPSILON, alpha=ACTOR_ALPHA):
+    """Exploration rates spread between ``base`` and ``base**(1 + alpha)``."""
+    if num_actors == 1:
+        return [base]
+    return [base ** (1 + alpha * i / (num_actors - 1)) for i in range(num_actors)]
+
+
+class SharedWeights:
+    """Network weights in shared memory with a version counter.
+
+    :meth:`publish` copies new weights into the buffer and never waits for
+    the actors; :meth:`read` returns the weights if they changed since the
+    version an actor already has.
+    """
+
+    def __init__(self, shapes, context):
+        self.shapes = [tuple(shape) for shape in shapes]
+        self.sizes = [int(np.prod(shape)) for shape in self.shapes]
+        self.buffer = context.Array("f", sum(self.sizes))
+        self.version = context.Value("q", 0, lock=False)
+
+    def publish(self, weights):
+        flat = np.concatenate([np.ravel(w) for w in weights]).astype(np.float32)
+        with self.buffer.get_lock():
+            np.frombuffer(self.buffer.get_obj(), dtype=np.float32)[:] = flat
+            self.version.value += 1
+
+    def read(self, version):
+        """Return ``(version, weights)``, with ``weights`` ``None`` if unchanged."""
+        with self.buffer.get_lock():
+            current = self.version.value
+            if current == version:
+                return version, None
+            flat = np.frombuffer(self.buffer.get_obj(), dtype=np.float32).copy()
+        weights = []
+        offset = 0
+        for shape, size in zip(self.shapes, self.sizes):
+            weights.append(flat[offset:offset + size].reshape(shape))
+            offset += size
+        return current, weights
+
+
+def run_actor(index, epsilon, episodes, shared, stop, max_steps=MAX_STEPS):
+    """Process main loop of one actor."""
+    env = LocalEnv(maps=MAPS[index % len(MAPS):] + MAPS[:index % len(MAPS)], coalesce=True)
+    # One random stream for the whole life of the actor; a new policy for
+    # every weight update must not restart the exploration sequence
+    rng = np.random.default_rng(index)
+    policy = DensePolicy((), seed=rng)
+    version = 0
+    while not stop.is_set():
+        version, weights = shared.read(version)
+        if weights is not None:
+            policy = DensePolicy(
+                weights, epsilon, seed=rng, camera_step=CAMERA_STEP, factorized=FACTORIZED_ACTIONS
+            )
+        states, actions, rewards, next_states, dones = [], [], [], [], []
+        state = env.reset()
+        for _ in range(max_steps):
+            a = policy.act(state)
+            env.send_action(a)
+            s2 = env.get_state()
+            states.append(state)
+            actions.append(a)
+            rewards.append(env.compute_reward(state, s2))
+            next_states.append(s2)
+            dones.append(env.done)
+            state = s2
+            if env.done:
+                break
+        item = (
+            index,
+            env.get_map_name(),
+            termination_reason(
+                env.done, env.battery <= 0, env.map_switched, env.crashed, env.coverage_done,
+                env.stalled,
+            ),
+            np.asarray(states, dtype=np.float32),
+            np.asarray(actions, dtype=np.int32),
+            np.asarray(rewards, dtype=np.float32),
+            np.asarray(next_states, dtype=np.float32),
+            np.asarray(dones, dtype=bool),
+        )
+        # Do not block forever on a full queue once the learner stops
+        while not stop.is_set():
+            try:
+                episodes.put(item, timeout=0.1)
+                break
+            except queue.Full:
+                pass
+
+
+def train_distributed(agent, logger, save, num_actors=NUM_ACTORS, context=None):
+    """Train ``agent`` with ``num_actors`` actor processes.
+
+    ``save`` is called after every logged episode.  The learner makes
+    ``UPDATE_RATIO`` gradient steps per received transition and publishes
+    the weights to all actors every ``WEIGHT_BROADCAST_EVERY`` steps.
+    """
+    ctx = mp.get_context(context)
+    episodes = ctx.Queue(maxsize=4 * num_actors)
+    stop = ctx.Event()
+    weights = agent.get_weights()
+    shared = SharedWeights([w.shape for w in weights], ctx)
+    shared.publish(weights)
+    epsilons = actor_epsilons(num_actors)
+    procs = []
+    for i, eps in enumerate(epsilons):
+        proc = ctx.Process(target=run_actor, args=(i, eps, episodes, shared, stop), daemon=True)
+        proc.start()
+        procs.append(proc)
+
+    ep = 0
+    collected = 0
+    updates = 0
+    try:
+        while ep < NUM_EPISODES:
+            if updates < collected * UPDATE_RATIO and agent.train_batch():
+                updates += 1
+                if updates % WEIGHT_BROADCAST_EVERY == 0:
+                    agent.sync_weights()
+                    shared.publish(agent.get_weights())
+                try:
+                    item = episodes.get_nowait()
+                except queue.Empty:
+                    continue
+            else:
+                try:
+                    item = episodes.get(timeout=0.1)
+                except queue.Empty:
+                    if not any(proc.is_alive() for proc in procs):
+                        codes = [proc.exitcode for proc in procs]
+                        raise RuntimeError(f"all actor processes exited (exit codes {codes})")
+                    continue
+            index, map_name, reason, states, actions, rewards, next_states, dones = item
+            for st in range(len(actions)):
+                agent.remember(states[st], actions[st], rewards[st], next_states[st], dones[st])
+                logger.log(
+                    ep, st, format_action(ACTIONS[actions[st]]), states[st].tolist(),
+                    float(rewards[st]), bool(dones[st]), epsilons[index],
+                )
+            collected += len(actions)
+            logger.flush()
+            save()
+            print(
+                f"Episode {ep} finished after {len(actions)} steps with reward "
+                f"{rewards.sum():.2f} on map {map_name} in actor {index} ({reason})"
+            )
+            ep += 1
+    finally:
+        stop.set()
+        # Actors may be putting an episode; drain the queue so they can exit
+        while any(p.is_alive() for p in procs):
+            try:
+                episodes.get(timeout=0.1)
+            except queue.Empty:
+                pass
+            for proc in procs:
+                proc.join(timeout=0)
+        agent.sync_weights()
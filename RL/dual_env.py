@@ -4,29 +4,104 @@ This class combines the headless training environment accessed via
 :class:`RemoteEnv` with the interactive server based environment
 (:class:`ServerEnv`). All state and reward calculations come from the
 training environment while the same actions are forwarded to the server
-for visualisation.
+for visualisation.  Any object with the same interface, e.g. an in-process
+:class:`~local_env.LocalEnv`, can be passed as ``train_env``.
 """
 
+import threading
+import time
+from collections import deque
+
 from remote_env import RemoteEnv
 from environment import ServerEnv
-from config import BASE_URL
+from http_client import HttpClient
+from config import BASE_URL, MIRROR_EVERY, MIRROR_MAX_HZ, MIRROR_QUEUE_SIZE
+
+_RESET = "reset"
 
 
 class DualEnv:
-    """Run actions on both the training and server environments."""
+    """Run actions on both the training and server environments.
+
+    Mirroring happens in a background thread so a slow browser does not
+    slow down training.  Only every ``mirror_every``-th action is forwarded,
+    at most ``max_hz`` per second; when the queue is full the oldest pending
+    action is dropped.  Resets are never dropped.
+    """
 
-    def __init__(self, train_url: str = "http://127.0.0.1:6000", base_url: str = BASE_URL):
-        self.train_env = RemoteEnv(train_url)
-        self.display_env = ServerEnv(base_url)
+    def __init__(self, train_url: str = "http://127.0.0.1:6000", base_url: str = BASE_URL,
+                 train_env=None, mirror_every: int = MIRROR_EVERY,
+                 max_hz: float = MIRROR_MAX_HZ, queue_size: int = MIRROR_QUEUE_SIZE):
+        self.train_env = train_env or RemoteEnv(train_url)
+        # The mirror thread gets its own connection pool
+        self._display_http = HttpClient(base_url)
+        self.display_env = ServerEnv(base_url, http=self._display_http)
         self.done = False
         self.map_name = "unknown"
+        self.mirror_every = max(1, mirror_every)
+        self.min_interval = 1.0 / max_hz if max_hz else 0.0
+        self.dropped = 0
+        self._steps = 0
+        self._last_mirror = 0.0
+        # The pending reset is kept apart from the actions so a full queue
+        # can never drop it
+        self.queue_size = max(1, queue_size)
+        self._actions = deque()
+        self._reset_pending = False
+        self._closed = False
+        self._pending = threading.Condition()
+        self._worker = threading.Thread(target=self._mirror_loop, daemon=True)
+        self._worker.start()
+
+    def _mirror_loop(self):
+        while True:
+            with self._pending:
+                while not (self._reset_pending or self._actions or self._closed):
+                    self._pending.wait()
+                if self._reset_pending:
+                    self._reset_pending = False
+                    item = _RESET
+                elif self._actions:
+                    item = self._actions.popleft()
+                else:
+                    break
+            try:
+                if item == _RESET:
+                    self.display_env.reset()
+                else:
+                    self.display_env.send_action(item)
+            except Exception:
+                pass
+
+    def _mirror(self, item):
+        """Queue ``item`` for the display, dropping stale actions if needed."""
+        with self._pending:
+            if item == _RESET:
+                # Pending actions belong to the finished episode
+                self.dropped += len(self._actions)
+                self._actions.clear()
+                self._reset_pending = True
+            else:
+                if len(self._actions) >= self.queue_size:
+                    self._actions.popleft()
+                    self.dropped += 1
+                self._actions.append(item)
+            self._pending.notify()
+
+    def close(self):
+        """Stop the mirroring thread and close both environments."""
+        with self._pending:
+            self._closed = True
+            self._pending.notify()
+        self._worker.join(timeout=5)
+        self._display_http.close()
+        if hasattr(self.train_env, "close"):
+            self.train_env.close()
 
     def reset(self):
         state = self.train_env.reset()
-        try:
-            self.display_env.reset()
-        except Exception:
-            pass
+        self._steps = 0
+        self._mirror(_RESET)
         self.done = self.train_env.done
         self.map_switched = getattr(self.train_env, "map_switched", False)
         self.crashed = getattr(self.train_env, "crashed", False)
@@ -36,10 +111,11 @@ class DualEnv:
         return state
 
     def send_action(self, idx):
-        try:
-            self.display_env.send_action(idx)
-        except Exception:
-            pass
+        self._steps += 1
+        now = time.monotonic()
+        if self._steps % self.mirror_every == 0 and now - self._last_mirror >= self.min_interval:
+            self._last_mirror = now
+            self._mirror(idx)
         self.train_env.send_action(idx)
         self.done = self.train_env.done
         self.map_switched = getattr(self.train_env, "map_switched", False)
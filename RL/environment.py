@@ -1,6 +1,6 @@
 import time
-import requests
 from utils import ACTIONS
+from http_client import get_client
 
 # Reward calculation constants
 STEP_PENALTY = -0.1          # small penalty each action
@@ -17,8 +17,9 @@ BATTERY_RATE = 0.000005
 BATTERY_PENALTY = -50         # punishment when battery depleted before goal
 
 class ServerEnv:
-    def __init__(self, base_url):
+    def __init__(self, base_url, http=None):
         self.base_url = base_url.rstrip("/")
+        self.http = http or get_client(self.base_url)
         self.done = False
         self.night_mode = False
         self.map_switched = False
@@ -30,6 +31,8 @@ class ServerEnv:
         self.battery = 1.0
         self.last_state_time = time.time()
         self.map_name = "unknown"
+        # Observation returned together with the last action
+        self._observation = None
 
     def reset(self):
         """Restart the simulator and return the initial state."""
@@ -45,18 +48,13 @@ class ServerEnv:
         self.last_state_time = time.time()
         # Update the current map name before restarting
         self._update_map_name()
+        self._observation = None
         try:
             # Trigger a restart of the simulator which resets the car to the
             # starting position. The front-end listens for this control command
-            # and reloads the current scenario.
-            requests.post(
-                f"{self.base_url}/api/control",
-                json={"action": "restart"},
-                timeout=5,
-            )
-            # clear any previous goal/waypoint flags
-            requests.get(f"{self.base_url}/api/goal", timeout=5)
-            requests.get(f"{self.base_url}/api/waypoint", timeout=5)
+            # and reloads the current scenario. The step endpoint also clears
+            # any previous goal/waypoint flags.
+            self.http.post("/api/step", json={"action": "restart"})
         except Exception:
             # If the restart request fails we still continue with a clean state
             pass
@@ -65,19 +63,20 @@ class ServerEnv:
         time.sleep(0.1)
         return self.get_state()
 
+    def _observe(self):
+        """Return the observation of the last action or fetch a new one."""
+        data, self._observation = self._observation, None
+        if data is None:
+            try:
+                res = self.http.get("/api/step")
+                data = res.json()
+            except Exception:
+                data = {}
+        return data
+
     def get_state(self):
-        try:
-            res = requests.get(f"{self.base_url}/api/car", timeout=5)
-            data = res.json()
-        except Exception:
-            data = {}
-        dist = data.get("distances", {})
-        front = dist.get("front", 0)
-        left = dist.get("left", 0)
-        right = dist.get("right", 0)
-        speed = data.get("speed", 0)
-        gyro = data.get("gyro", 0)
-        rpm = data.get("rpm", 0)
+        data = self._observe()
+        front, left, right, speed, gyro, rpm = data.get("state") or [0] * 6
         now = time.time()
         dt = now - self.last_state_time
         self.last_state_time = now
@@ -88,40 +87,18 @@ class ServerEnv:
             self.last_move_time = time.time()
         elif time.time() - self.last_move_time > 10:
             try:
-                requests.post(f"{self.base_url}/api/control", json={"action": "restart"}, timeout=5)
+                self.http.post("/api/control", json={"action": "restart"})
             except Exception:
                 pass
             self.stalled = True
             self.done = True
             return [front, left, right, 0, gyro, rpm, 0.0, self.battery]
-        try:
-            slam_res = requests.get(f"{self.base_url}/api/slam-map", timeout=5)
-            cells = slam_res.json().get("cells", [])
-            non_obstacle = [val for row in cells for val in row if val != 2]
-            total = len(non_obstacle)
-            if total and all(val != 0 for val in non_obstacle):
-                # The virtual environment returns the static grid when no
-                # SLAM map is available. Treat this case as 0% coverage so the
-                # agent does not immediately terminate an episode.
-                coverage = 0.0
-            else:
-                known = sum(1 for val in non_obstacle if val != 0)
-                coverage = known / total if total else 0.0
-        except Exception:
-            coverage = 0.0
-        try:
-            goal_res = requests.get(f"{self.base_url}/api/goal", timeout=5)
-            if goal_res.json().get("reached"):
-                self.map_switched = True
-                self.done = True
-        except Exception:
-            pass
-        try:
-            wp_res = requests.get(f"{self.base_url}/api/waypoint", timeout=5)
-            if wp_res.json().get("reached"):
-                self.waypoint_hit = True
-        except Exception:
-            pass
+        coverage = data.get("coverage", 0.0)
+        if data.get("goal"):
+            self.map_switched = True
+            self.done = True
+        if data.get("waypoint"):
+            self.waypoint_hit = True
         # Mark the episode as finished if the target was reached or a crash
         # occurred. As we do not get explicit signals from the simulator we use
         # simple heuristics based on the sensor values.
@@ -136,7 +113,7 @@ class ServerEnv:
     def _update_map_name(self):
         """Retrieve the name of the currently loaded map from the server."""
         try:
-            res = requests.get(f"{self.base_url}/api/maps", timeout=5)
+            res = self.http.get("/api/maps")
             maps = res.json()
             if maps:
                 self.map_name = maps[-1].get("name", self.map_name)
@@ -150,30 +127,19 @@ class ServerEnv:
         return self.map_name
 
     def send_action(self, idx):
-        """Send a driving and camera command for the chosen action index."""
+        """Send the driving and camera command of an index into ``ACTIONS``
+        or of a ``(drive, angle)`` tuple."""
         self.map_switched = False
         self.waypoint_hit = False
-        drive, angle = ACTIONS[idx]
+        drive, angle = idx if isinstance(idx, tuple) else ACTIONS[idx]
 
-        # First send the driving command
+        # Send the driving and camera command together; the response holds
+        # the observation used by the following ``get_state`` call.
         try:
-            requests.post(
-                f"{self.base_url}/api/control",
-                json={"action": drive},
-                timeout=5,
-            )
+            res = self.http.post("/api/step", json={"action": drive, "camera": int(angle)})
+            self._observation = res.json()
         except Exception:
-            pass
-
-        # Then adjust the camera orientation
-        try:
-            requests.post(
-                f"{self.base_url}/api/control",
-                json={"action": "camera2", "value": int(angle)},
-                timeout=5,
-            )
-        except Exception:
-            pass
+            self._observation = None
 
         self.done = False
 
@@ -0,0 +1,155 @@
+"""Shared HTTP client for the environment adapters.
+
+All adapters talking to the same server share one :class:`HttpClient` (see
+:func:`get_client`), so connections are kept alive and reused instead of
+opening a new TCP connection for every request.  The client applies
+per-endpoint timeouts, retries failed connections a bounded number of times
+and records the latency of every endpoint.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ConnectTimeoutError, MaxRetryError, NewConnectionError
+
+from config import HTTP_TIMEOUT, HTTP_RETRIES, HTTP_BACKOFF
+
+# Endpoints which regularly take longer than ``HTTP_TIMEOUT``
+DEFAULT_TIMEOUTS = {
+    "/rollout": 300.0,
+    "/step_batch": 60.0,
+    "/load_map": 30.0,
+}
+
+
+def _connect_failed(error):
+    """Whether ``error`` happened before the request reached the server."""
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    reason = error.args[0] if error.args else None
+    if isinstance(reason, MaxRetryError):
+        reason = reason.reason
+    return isinstance(reason, (NewConnectionError, ConnectTimeoutError))
+
+
+class HttpClient:
+    """Keep-alive HTTP client with timeouts, retries and latency counters.
+
+    ``timeouts`` maps endpoint names to timeouts in seconds; other endpoints
+    use ``timeout``.  Requests failing with a connection error are retried
+    up to ``retries`` times, waiting ``backoff * 2**attempt`` seconds in
+    between.  Other methods are only retried if the connection could not be
+    established, since the server may already have executed the request.
+
+    A ``requests.Session`` is not guaranteed to be thread-safe; a thread
+    sending requests on its own should use its own client.
+    """
+
+    def __init__(self, base_url, timeout=HTTP_TIMEOUT, timeouts=None, retries=HTTP_RETRIES,
+                 backoff=HTTP_BACKOFF, pool_size=4):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.timeouts = dict(DEFAULT_TIMEOUTS, **(timeouts or {}))
+        self.retries = retries
+        self.backoff = backoff
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.pool_size = pool_size
+        self._executor = None
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def request(self, method, path, endpoint=None, **kwargs):
+        """Send a request to ``base_url + path`` and return the response.
+
+        ``endpoint`` names the request for timeouts and statistics; it
+        defaults to ``path``.
+        """
+        endpoint = endpoint or path
+        kwargs.setdefault("timeout", self.timeouts.get(endpoint, self.timeout))
+        url = self.base_url + path
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            try:
+                res = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self._record(endpoint, time.perf_counter() - start, error=True)
+                retry = method == "GET" or _connect_failed(e)
+                if not retry or attempt >= self.retries:
+                    raise
+                time.sleep(self.backoff * 2 ** attempt)
+                attempt += 1
+                continue
+            self._record(endpoint, time.perf_counter() - start)
+            return res
+
+    def get(self, path, endpoint=None, **kwargs):
+        return self.request("GET", path, endpoint, **kwargs)
+
+    def post(self, path, endpoint=None, **kwargs):
+        return self.request("POST", path, endpoint, **kwargs)
+
+    def delete(self, path, endpoint=None, **kwargs):
+        return self.request("DELETE", path, endpoint, **kwargs)
+
+    def submit(self, method, path, endpoint=None, **kwargs):
+        """Send a request in the background and return a ``Future``.
+
+        Several submitted requests are in flight at the same time on
+        separate pooled connections, which hides their latency when the
+        caller does not need the responses immediately.
+        """
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.pool_size)
+        return self._executor.submit(self.request, method, path, endpoint, **kwargs)
+
+    def _record(self, endpoint, elapsed, error=False):
+        with self._lock:
+            stats = self._stats.setdefault(endpoint, [0, 0.0, 0.0, 0])
+            stats[0] += 1
+            stats[1] += elapsed
+            stats[2] = max(stats[2], elapsed)
+            stats[3] += error
+
+    def stats(self):
+        """Return ``{endpoint: {count, mean_ms, max_ms, errors}}``."""
+        with self._lock:
+            return {
+                endpoint: {
+                    "count": count,
+                    "mean_ms": 1000 * total / count,
+                    "max_ms": 1000 * peak,
+                    "errors": errors,
+                }
+                for endpoint, (count, total, peak, errors) in self._stats.items()
+            }
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats.clear()
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        self.session.close()
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(base_url):
+    """Return the shared :class:`HttpClient` for ``base_url``."""
+    key = base_url.rstrip("/")
+    with _clients_lock:
+        if key not in _clients:
+            _clients[key] = HttpClient(key)
+        return _clients[key]
@@ -0,0 +1,51 @@
+"""Background training of a :class:`DQNAgent`.
+
+The :class:`Learner` thread samples minibatches from the agent's replay
+memory and trains the network while the training loop keeps stepping the
+environment.  TensorFlow releases the GIL while it computes, so acting and
+learning overlap instead of alternating.
+"""
+
+import threading
+import time
+
+from config import UPDATE_RATIO, WEIGHT_SYNC_EVERY
+
+
+class Learner(threading.Thread):
+    """Train ``agent`` continuously from its replay memory.
+
+    The learner performs up to ``update_ratio`` gradient steps per stored
+    transition and waits for new data once it is ahead.  Every
+    ``sync_every`` steps the weights used by :meth:`DQNAgent.act` are
+    refreshed.
+    """
+
+    def __init__(self, agent, update_ratio=UPDATE_RATIO, sync_every=WEIGHT_SYNC_EVERY):
+        super().__init__(daemon=True)
+        self.agent = agent
+        self.update_ratio = update_ratio
+        self.sync_every = max(1, sync_every)
+        self.updates = 0
+        self._start_count = agent.memory.added
+        self._stop_event = threading.Event()
+
+    def _budget(self):
+        """Number of gradient steps allowed by the data collected so far."""
+        collected = self.agent.memory.added - self._start_count
+        return int(collected * self.update_ratio) - self.updates
+
+    def run(self):
+        while not self._stop_event.is_set():
+            if self._budget() <= 0 or not self.agent.train_batch():
+                time.sleep(0.001)
+                continue
+            self.updates += 1
+            if self.updates % self.sync_every == 0:
+                self.agent.sync_weights()
+
+    def stop(self):
+        """Stop training and publish the final weights to the agent."""
+        self._stop_event.set()
+        self.join()
+        self.agent.sync_weights()
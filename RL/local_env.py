@@ -0,0 +1,81 @@
+"""In-process adapter for the headless simulator in ``TE/TE.py``.
+
+:class:`LocalEnv` offers the same interface as :class:`RemoteEnv`, including
+the rotation over the level maps, but drives :class:`TE.TE.SimEnv` directly
+instead of talking to the TE HTTP server.
+"""
+
+import os
+
+from _paths import ROOT_DIR
+from TE.TE import SimEnv
+
+TE_DIR = os.path.join(ROOT_DIR, "TE")
+
+
+class LocalEnv:
+    """Run :class:`SimEnv` in the training process.
+
+    ``maps`` are resolved relative to ``TE/``.  One simulator per map is
+    created on first use and kept, so rotating maps does not reload them.
+    Maps are loaded through the compiled map cache unless ``map_cache=False``
+    is given.  Further keyword arguments are passed to :class:`SimEnv`.
+    """
+
+    def __init__(self, maps=None, **env_kwargs):
+        self.maps = maps or ["Level1.csv", "Level2.csv", "Level3.csv", "Level4.csv"]
+        self.env_kwargs = dict(env_kwargs)
+        self.env_kwargs.setdefault("map_cache", True)
+        self._envs = {}
+        self.map_index = 0
+        self.env = self._get_env(self.maps[self.map_index])
+        self.map_name = self.env.map_name
+        self.state = None
+        self.done = False
+        self._last_reward = 0.0
+        self.map_switched = False
+        self.crashed = False
+        self.battery = 1.0
+        self.coverage_done = False
+        self.stalled = False
+        self.coverage = 0.0
+
+    def _get_env(self, fname):
+        if fname not in self._envs:
+            self._envs[fname] = SimEnv(os.path.join(TE_DIR, fname), **self.env_kwargs)
+        return self._envs[fname]
+
+    def _update_flags(self, reward):
+        self.done = self.env.done
+        self._last_reward = reward
+        self.map_switched = self.env.goal_reached
+        self.crashed = self.env.car.crashed
+        self.battery = self.env.car.battery
+        self.coverage = self.env.coverage
+        self.coverage_done = self.env.coverage_done
+        self.stalled = self.env.stalled
+
+    def reset(self):
+        if (self.map_switched or self.coverage_done) and self.maps:
+            self.map_index = (self.map_index + 1) % len(self.maps)
+            self.env = self._get_env(self.maps[self.map_index])
+            self.map_name = self.env.map_name
+        self.state = self.env.reset()
+        self._update_flags(0.0)
+        return self.state
+
+    def send_action(self, idx):
+        self.env.send_action(int(idx))
+        new_state = self.env.get_state()
+        reward = self.env.compute_reward(self.state, new_state)
+        self.state = new_state
+        self._update_flags(reward)
+
+    def get_state(self):
+        return self.state
+
+    def compute_reward(self, _s, _s2):
+        return self._last_reward
+
+    def get_map_name(self):
+        return self.map_name
@@ -1,11 +1,24 @@
+import io
+import numbers
 import os
-import requests
+import numpy as np
+
+from http_client import get_client
+from config import CAMERA_STEP, FACTORIZED_ACTIONS
 
 class RemoteEnv:
-    """Client for the HTTP test environment in ``TE/TE.py``."""
+    """Client for the HTTP test environment in ``TE/TE.py``.
+
+    With ``session=True`` the client creates its own simulator session on
+    the server so several trainers can share one server process.
+    """
 
-    def __init__(self, base_url="http://127.0.0.1:6000", maps=None):
+    def __init__(self, base_url="http://127.0.0.1:6000", maps=None, session=False):
         self.base_url = base_url.rstrip("/")
+        self.http = get_client(self.base_url)
+        # Path prefix of the server side session, empty for the default one
+        self.prefix = ""
+        self.session_id = None
         self.state = None
         self.done = False
         self._last_reward = 0.0
@@ -18,20 +31,43 @@ class RemoteEnv:
         self.coverage_done = False
         self.stalled = False
         self.coverage = 0.0
+        if session:
+            res = self.http.post("/sessions", json={"file": self.maps[self.map_index]})
+            res.raise_for_status()
+            self.session_id = res.json()["id"]
+            self.prefix = f"/sessions/{self.session_id}"
 
-    def reset(self):
+    @property
+    def url(self):
+        return self.base_url + self.prefix
+
+    def _post(self, endpoint, **kwargs):
+        """POST to ``endpoint`` of this client's simulator session."""
+        return self.http.post(self.prefix + endpoint, endpoint, **kwargs)
+
+    def close(self):
+        """Delete the server side session, if one was created."""
+        if self.session_id:
+            try:
+                self.http.delete(self.prefix, "/sessions")
+            except Exception:
+                pass
+            self.session_id = None
+            self.prefix = ""
+
+    def _rotate_map(self):
+        """Load the next map after the goal or full coverage was reached."""
         if (self.map_switched or self.coverage_done) and self.maps:
             self.map_index = (self.map_index + 1) % len(self.maps)
             try:
-                requests.post(
-                    f"{self.base_url}/load_map",
-                    json={"file": self.maps[self.map_index]},
-                    timeout=5,
-                )
+                self._post("/load_map", json={"file": self.maps[self.map_index]})
             except Exception:
                 pass
             self.map_name = os.path.splitext(os.path.basename(self.maps[self.map_index]))[0]
-        res = requests.post(f"{self.base_url}/reset")
+
+    def reset(self):
+        self._rotate_map()
+        res = self._post("/reset")
         data = res.json()
         self.state = data["state"]
         self.done = data.get("done", False)
@@ -46,7 +82,7 @@ class RemoteEnv:
         return self.state
 
     def send_action(self, idx):
-        res = requests.post(f"{self.base_url}/step", json={"action": int(idx)})
+        res = self._post("/step", json={"action": int(idx)})
         data = res.json()
         self.state = data["state"]
         self.done = data.get("done", False)
@@ -59,6 +95,33 @@ class RemoteEnv:
         self.stalled = data.get("stalled", False)
         self.map_name = data.get("map_name", self.map_name)
 
+    def step_batch(self, actions, repeat=1):
+        """Execute several actions with a single ``/step_batch`` request.
+
+        ``actions`` is either a list of action indices or a single index
+        which is repeated ``repeat`` times.  The server stops at the end of
+        the episode.  Returns the per-step lists of the response; the
+        instance attributes reflect the last executed step.
+        """
+        if isinstance(actions, numbers.Integral):
+            payload = {"action": int(actions), "repeat": int(repeat)}
+        else:
+            payload = {"actions": [int(a) for a in actions]}
+        res = self._post("/step_batch", json=payload)
+        data = res.json()
+        self.map_name = data.get("map_name", self.map_name)
+        if len(data.get("dones", ())):
+            self.state = data["states"][-1]
+            self.done = data["dones"][-1]
+            self._last_reward = data["rewards"][-1]
+            self.map_switched = data["goal_reached"][-1]
+            self.crashed = data["crashed"][-1]
+            self.battery = data["battery"][-1]
+            self.coverage = data["coverage"][-1]
+            self.coverage_done = data["coverage_done"][-1]
+            self.stalled = data["stalled"][-1]
+        return data
+
     def get_state(self):
         return self.state
 
@@ -66,4 +129,44 @@ class RemoteEnv:
         return self._last_reward
 
     def get_map_name(self):
-        return self.map_name
\ No newline at end of file
+        return self.map_name
+
+    def rollout(self, weights=(), epsilon=0.0, episodes=1, max_steps=1000, seed=None):
+        """Let the server play whole episodes with the given network weights.
+
+        Returns a dict of NumPy arrays (see ``run_episodes`` in ``TE/TE.py``).
+        The termination flags of the last episode are stored on the instance
+        so the map rotation behaves as with :meth:`reset`/:meth:`send_action`.
+        """
+        self._rotate_map()
+        buf = io.BytesIO()
+        if len(weights):
+            np.savez(buf, *weights)
+        params = {
+            "epsilon": epsilon,
+            "episodes": episodes,
+            "max_steps": max_steps,
+            "camera_step": CAMERA_STEP,
+            "factorized": int(FACTORIZED_ACTIONS),
+        }
+        if seed is not None:
+            params["seed"] = seed
+        res = self._post(
+            "/rollout",
+            params=params,
+            data=buf.getvalue(),
+            headers={"Content-Type": "application/octet-stream"},
+        )
+        res.raise_for_status()
+        with np.load(io.BytesIO(res.content)) as data:
+            traj = {k: data[k] for k in data.files}
+        self.map_name = res.headers.get("X-Map-Name", self.map_name)
+        if len(traj["next_states"]):
+            self.state = traj["next_states"][-1].tolist()
+        self.done = bool(traj["dones"][-1]) if len(traj["dones"]) else False
+        self.map_switched = bool(traj["goal_reached"][-1])
+        self.crashed = bool(traj["crashed"][-1])
+        self.stalled = bool(traj["stalled"][-1])
+        self.coverage_done = bool(traj["coverage_done"][-1])
+        self.battery = float(traj["battery"][-1])
+        return traj
@@ -0,0 +1,212 @@
+"""Replay memories backed by preallocated NumPy arrays."""
+
+import numpy as np
+
+
+class ReplayBuffer:
+    """Ring buffer of ``(state, action, reward, next_state, done)`` transitions.
+
+    All fields live in contiguous arrays allocated up front, so the memory
+    use is fixed (``capacity * (8 * state_size + 12)`` bytes) and a
+    minibatch is gathered by index without converting Python objects.  When
+    the buffer is full the oldest transitions are overwritten.
+    """
+
+    def __init__(self, capacity, state_size):
+        self.capacity = int(capacity)
+        self.states = np.zeros((self.capacity, state_size), dtype=np.float32)
+        self.actions = np.zeros(self.capacity, dtype=np.int32)
+        self.rewards = np.zeros(self.capacity, dtype=np.float32)
+        self.next_states = np.zeros((self.capacity, state_size), dtype=np.float32)
+        self.dones = np.zeros(self.capacity, dtype=np.float32)
+        self.pos = 0
+        self.size = 0
+        # Number of transitions ever stored
+        self.added = 0
+
+    def __len__(self):
+        return self.size
+
+    def append(self, s, a, r, s2, done):
+        """Store one transition and return its slot."""
+        i = self.pos
+        self.states[i] = s
+        self.actions[i] = a
+        self.rewards[i] = r
+        self.next_states[i] = s2
+        self.dones[i] = done
+        self.pos = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+        self.added += 1
+        return i
+
+    def sample_indices(self, batch):
+        return np.random.randint(0, self.size, size=batch)
+
+    def get(self, idx):
+        """Return the transitions at ``idx`` as a tuple of arrays."""
+        return (
+            self.states[idx],
+            self.actions[idx],
+            self.rewards[idx],
+            self.next_states[idx],
+            self.dones[idx],
+        )
+
+    def sample(self, batch):
+        """Draw ``batch`` transitions uniformly with replacement.
+
+        Returns the transition arrays followed by the importance-sampling
+        weights (all ones here) and the sampled indices.
+        """
+        idx = self.sample_indices(batch)
+        return self.get(idx) + (np.ones(batch, dtype=np.float32), idx)
+
+    def update_priorities(self, idx, td_errors):
+        """Uniform sampling ignores the TD errors."""
+
+    def _order(self):
+        """Slots of the stored transitions from oldest to newest."""
+        return (self.pos - self.size + np.arange(self.size)) % self.capacity
+
+    def snapshot(self):
+        """Return a copy of the stored transitions as a dict of arrays.
+
+        The transitions are ordered from oldest to newest, so the snapshot
+        can be restored into a buffer of a different capacity.
+        """
+        idx = self._order()
+        states, actions, rewards, next_states, dones = self.get(idx)
+        return {
+            "states": states,
+            "actions": actions,
+            "rewards": rewards,
+            "next_states": next_states,
+            "dones": dones,
+            "added": np.int64(self.added),
+        }
+
+    def restore(self, data):
+        """Replace the contents with a :meth:`snapshot`.
+
+        Returns the positions in ``data`` of the transitions that were kept;
+        only the newest ``capacity`` transitions fit.
+        """
+        keep = np.arange(len(data["actions"]))[-self.capacity:]
+        n = len(keep)
+        self.states[:n] = data["states"][keep]
+        self.actions[:n] = data["actions"][keep]
+        self.rewards[:n] = data["rewards"][keep]
+        self.next_states[:n] = data["next_states"][keep]
+        self.dones[:n] = data["dones"][keep]
+        self.pos = n % self.capacity
+        self.size = n
+        self.added = int(data["added"])
+        return keep
+
+
+class SumTree:
+    """Binary tree whose inner nodes hold the sum of their children.
+
+    Setting a leaf and drawing a leaf with probability proportional to its
+    value both take O(log n).  Both operations work on whole index arrays,
+    one tree level at a time.
+    """
+
+    def __init__(self, capacity):
+        self.leaves = 1 << max(0, (int(capacity) - 1).bit_length())
+        self.tree = np.zeros(2 * self.leaves)
+
+    @property
+    def total(self):
+        return self.tree[1]
+
+    def get(self, idx):
+        return self.tree[np.asarray(idx) + self.leaves]
+
+    def update(self, idx, values):
+        """Set the leaves ``idx`` to ``values`` and refresh their ancestors."""
+        nodes = np.asarray(idx, dtype=np.int64) + self.leaves
+        self.tree[nodes] = values
+        nodes = np.unique(nodes // 2)
+        while nodes[0] >= 1:
+            self.tree[nodes] = self.tree[2 * nodes] + self.tree[2 * nodes + 1]
+            nodes = np.unique(nodes // 2)
+
+    def find(self, values):
+        """Return the leaves at which the prefix sums reach ``values``."""
+        values = np.asarray(values, dtype=np.float64).copy()
+        nodes = np.ones(len(values), dtype=np.int64)
+        while nodes[0] < self.leaves:
+            left = 2 * nodes
+            right = values >= self.tree[left]
+            values = np.where(right, values - self.tree[left], values)
+            nodes = np.where(right, left + 1, left)
+        return nodes - self.leaves
+
+
+class PrioritizedReplayBuffer(ReplayBuffer):
+    """Replay memory sampling transitions in proportion to their TD error.
+
+    Transition ``i`` is drawn with probability ``p_i**alpha / sum(p**alpha)``
+    where ``p_i = |td_error| + eps``; new transitions get the largest
+    priority seen so far.  The returned importance-sampling weights
+    ``(N * P(i))**-beta`` (normalised to a maximum of 1) correct the bias of
+    the non-uniform sampling; ``beta`` grows linearly to 1 over
+    ``beta_steps`` calls of :meth:`sample`.
+    """
+
+    def __init__(self, capacity, state_size, alpha=0.6, beta=0.4, beta_steps=100000, eps=1e-6):
+        super().__init__(capacity, state_size)
+        self.tree = SumTree(self.capacity)
+        self.alpha = alpha
+        self.beta = beta
+        self.beta_increment = (1.0 - beta) / beta_steps if beta_steps else 0.0
+        self.eps = eps
+        self.max_priority = 1.0
+
+    def append(self, s, a, r, s2, done):
+        i = super().append(s, a, r, s2, done)
+        self.tree.update([i], self.max_priority ** self.alpha)
+        return i
+
+    def sample_indices(self, batch):
+        # One draw from each of ``batch`` equal slices of the total priority
+        segment = self.tree.total / batch
+        values = (np.arange(batch) + np.random.rand(batch)) * segment
+        return np.minimum(self.tree.find(values), self.size - 1)
+
+    def sample(self, batch):
+        idx = self.sample_indices(batch)
+        probs = self.tree.get(idx) / self.tree.total
+        weights = (self.size * probs) ** -self.beta
+        weights /= weights.max()
+        self.beta = min(1.0, self.beta + self.beta_increment)
+        return self.get(idx) + (weights.astype(np.float32), idx)
+
+    def update_priorities(self, idx, td_errors):
+        """Set the priorities of the transitions ``idx`` from their TD errors."""
+        priorities = np.abs(td_errors) + self.eps
+        self.max_priority = max(self.max_priority, float(priorities.max()))
+        self.tree.update(idx, priorities ** self.alpha)
+
+    def snapshot(self):
+        data = super().snapshot()
+        data["priorities"] = self.tree.get(self._order())
+        data["max_priority"] = np.float64(self.max_priority)
+        data["beta"] = np.float64(self.beta)
+        return data
+
+    def restore(self, data):
+        keep = super().restore(data)
+        self.tree.tree[:] = 0.0
+        if "priorities" in data:
+            self.max_priority = float(data["max_priority"])
+            self.beta = float(data["beta"])
+            priorities = data["priorities"][keep]
+        else:
+            # Saved from a uniform buffer
+            priorities = np.full(len(keep), self.max_priority ** self.alpha)
+        if len(keep):
+            self.tree.update(np.arange(len(keep)), priorities)
+        return keep
@@ -0,0 +1,70 @@
+"""Socket based client for the headless test environment.
+
+:class:`StreamEnv` behaves like :class:`RemoteEnv` but resets and steps the
+simulator through the binary socket endpoint of ``TE/TE.py`` instead of one
+HTTP request per action.  Map changes and rollouts still use HTTP.
+"""
+
+import socket
+
+import numpy as np
+
+from remote_env import RemoteEnv
+import _paths  # noqa: F401  (puts the repository root on sys.path)
+from TE.TE import (
+    STREAM_REQUEST, STREAM_REPLY, FLAG_DONE, FLAG_GOAL, FLAG_CRASHED, FLAG_STALLED,
+    FLAG_COVERAGE, FLAG_ERROR,
+)
+
+
+class StreamEnv(RemoteEnv):
+    """Drop-in replacement for :class:`RemoteEnv` using a persistent socket."""
+
+    def __init__(self, base_url="http://127.0.0.1:6000", maps=None, session=False,
+                 stream_address=("127.0.0.1", 6001)):
+        super().__init__(base_url, maps, session)
+        self.sock = socket.create_connection(stream_address, timeout=5)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        if self.session_id:
+            sid = self.session_id.encode()
+            self.sock.sendall(STREAM_REQUEST.pack(b"B", len(sid)) + sid)
+            self._receive()
+
+    def _receive(self):
+        header = self._recv_exact(STREAM_REPLY.size)
+        flags, n, reward, battery, coverage = STREAM_REPLY.unpack(header)
+        if flags & FLAG_ERROR:
+            raise RuntimeError("stream request rejected by the server")
+        state = np.frombuffer(self._recv_exact(4 * n), dtype="<f4").tolist()
+        self.state = state
+        self._last_reward = reward
+        self.done = bool(flags & FLAG_DONE)
+        self.map_switched = bool(flags & FLAG_GOAL)
+        self.crashed = bool(flags & FLAG_CRASHED)
+        self.stalled = bool(flags & FLAG_STALLED)
+        self.coverage_done = bool(flags & FLAG_COVERAGE)
+        self.battery = battery
+        self.coverage = coverage
+        return state
+
+    def _recv_exact(self, size):
+        buf = bytearray()
+        while len(buf) < size:
+            chunk = self.sock.recv(size - len(buf))
+            if not chunk:
+                raise ConnectionError("stream closed by the server")
+            buf += chunk
+        return bytes(buf)
+
+    def reset(self):
+        self._rotate_map()
+        self.sock.sendall(STREAM_REQUEST.pack(b"R", 0))
+        return self._receive()
+
+    def send_action(self, idx):
+        self.sock.sendall(STREAM_REQUEST.pack(b"S", int(idx)))
+        self._receive()
+
+    def close(self):
+        self.sock.close()
+        super().close()
@@ -1,33 +1,28 @@
 import numpy as np
-from config import BASE_URL, NUM_EPISODES, MAX_STEPS
-from agent import DQNAgent
+from config import BASE_URL, NUM_EPISODES, MAX_STEPS, NUM_WORKERS, DUAL_LOCAL, ASYNC_LEARNER
+from checkpoint import Checkpointer
 from logger import Logger
 from pathlib import Path
-from utils import ACTIONS, format_action
-
-ENV_CHOICE = input(
-    "Select environment - [V]irtual, [T]est or [B]oth: "
-).strip().lower()
-if ENV_CHOICE == "t":
-    from remote_env import RemoteEnv as Env
-    env = Env()
-elif ENV_CHOICE == "b":
-    from dual_env import DualEnv as Env
-    env = Env()
-else:
-    from environment import ServerEnv as Env
-    env = Env(BASE_URL)
+from utils import ACTIONS, format_action, termination_reason
 
 MODEL_FILE = Path(__file__).with_name("dqn_model.keras")
+CHECKPOINT_DIR = Path(__file__).with_name("checkpoints")
 
-if __name__ == '__main__':
-    agent = DQNAgent(str(MODEL_FILE) if MODEL_FILE.exists() else None)
-    log_path = Path(__file__).with_name("rl_log.csv")
-    logger = Logger(str(log_path))
+
+def learn(agent, learner):
+    """Train after an episode unless a background learner is running."""
+    if learner is None:
+        agent.replay()
+    else:
+        agent.decay_epsilon()
+
+
+def train(env, agent, logger, learner=None, checkpoints=None):
+    """Episode loop for a single environment."""
     for ep in range(NUM_EPISODES):
         state = env.reset()
         total = 0
-        termination_reason = "Max. Schritte"
+        reason = "Max. Schritte"
         for st in range(MAX_STEPS):
             a = agent.act(np.array(state))
             env.send_action(a)
@@ -47,33 +42,168 @@ if __name__ == '__main__':
             state = s2
             total += r
             if done:
-                if battery <= 0:
-                    termination_reason = "Batterie leer"
-                elif map_switched:
-                    termination_reason = "Ziel erreicht"
-                elif crashed:
-                    termination_reason = "Crash"
-                elif coverage_done:
-                    termination_reason = "95% Abdeckung"
-                elif stalled:
-                    termination_reason = "Stall"
-                else:
-                    termination_reason = "Unbekannt"
+                reason = termination_reason(
+                    done, battery <= 0, map_switched, crashed, coverage_done, stalled
+                )
                 break
         # Restart the map after early termination so the next episode begins
         # with a clean SLAM map and full battery.  Only keep the current map
         # when coverage finished the episode.
-        if termination_reason != "95% Abdeckung":
+        if reason != "95% Abdeckung":
             try:
                 env.reset()
             except Exception:
                 pass
-        agent.replay()
+        learn(agent, learner)
         logger.flush()
-        agent.save(str(MODEL_FILE))
+        if checkpoints is not None:
+            checkpoints.maybe_save()
         map_name = getattr(env, "get_map_name", lambda: "unknown")()
         print(
             f"Episode {ep} finished after {st + 1} steps with reward {total:.2f} "
-            f"on map {map_name} ({termination_reason})"
+            f"on map {map_name} ({reason})"
+        )
+
+
+def train_batched(env, agent, logger, learner=None, checkpoints=None):
+    """Training loop for batch environments such as ``SimEnvPool``.
+
+    All environments are stepped together.  Whenever one of them finishes an
+    episode (or reaches ``MAX_STEPS``) the agent is trained and saved just
+    like after an episode of the single environment loop.
+    """
+    states = env.reset()
+    totals = np.zeros(env.num_envs)
+    steps = np.zeros(env.num_envs, dtype=int)
+    ep = 0
+    while ep < NUM_EPISODES:
+        actions = agent.act(states)
+        s2, rewards, dones = env.step(actions)
+        next_states = np.where(dones[:, np.newaxis], env.terminal_states, s2)
+        for i, a in enumerate(actions):
+            agent.remember(states[i], a, rewards[i], next_states[i], bool(dones[i]))
+            logger.log(
+                ep, steps[i], format_action(ACTIONS[a]), states[i].tolist(),
+                rewards[i], bool(dones[i]), agent.epsilon,
+            )
+        totals += rewards
+        steps += 1
+        truncated = ~dones & (steps >= MAX_STEPS)
+        if truncated.any():
+            s2 = env.reset(truncated)
+        states = s2
+        finished = np.flatnonzero(dones | truncated)
+        if len(finished):
+            flags = (
+                env.battery_empty, env.goal_reached, env.crashed, env.coverage_done, env.stalled
+            )
+            map_names = getattr(env, "map_names", ["unknown"] * env.num_envs)
+        for i in finished:
+            reason = termination_reason(dones[i], *(flag[i] for flag in flags))
+            learn(agent, learner)
+            logger.flush()
+            if checkpoints is not None:
+                checkpoints.maybe_save()
+            print(
+                f"Episode {ep} finished after {steps[i]} steps with reward {totals[i]:.2f} "
+                f"on map {map_names[i]} in worker {i} ({reason})"
+            )
+            totals[i] = 0
+            steps[i] = 0
+            ep += 1
+
+
+def train_rollouts(env, agent, logger, learner=None, checkpoints=None):
+    """Training loop letting the TE server play each episode in one request.
+
+    The current network weights and epsilon are sent to the server which
+    returns the complete trajectory of the episode.
+    """
+    for ep in range(NUM_EPISODES):
+        traj = env.rollout(agent.get_weights(), agent.epsilon, max_steps=MAX_STEPS)
+        for st, (s, a, r, s2, done) in enumerate(zip(
+            traj["states"], traj["actions"], traj["rewards"],
+            traj["next_states"], traj["dones"],
+        )):
+            agent.remember(s, int(a), float(r), s2, bool(done))
+            logger.log(ep, st, format_action(ACTIONS[a]), s.tolist(), float(r), bool(done), agent.epsilon)
+        reason = termination_reason(
+            len(traj["dones"]) and traj["dones"][-1], traj["battery"][-1] <= 0,
+            traj["goal_reached"][-1], traj["crashed"][-1], traj["coverage_done"][-1],
+            traj["stalled"][-1],
         )
-    logger.close()
\ No newline at end of file
+        learn(agent, learner)
+        logger.flush()
+        if checkpoints is not None:
+            checkpoints.maybe_save()
+        print(
+            f"Episode {ep} finished after {traj['steps'][-1]} steps with reward "
+            f"{traj['rewards'].sum():.2f} on map {env.get_map_name()} ({reason})"
+        )
+
+
+if __name__ == '__main__':
+    ENV_CHOICE = input(
+        "Select environment - [V]irtual, [T]est, [L]ocal, [B]oth, [P]ool, [D]istributed, "
+        "[R]ollout or [S]tream: "
+    ).strip().lower()
+    if ENV_CHOICE in ("t", "r"):
+        from remote_env import RemoteEnv as Env
+        env = Env()
+    elif ENV_CHOICE == "s":
+        from stream_env import StreamEnv as Env
+        env = Env()
+    elif ENV_CHOICE == "l":
+        from local_env import LocalEnv as Env
+        env = Env()
+    elif ENV_CHOICE == "b":
+        from dual_env import DualEnv as Env
+        if DUAL_LOCAL:
+            from local_env import LocalEnv
+            env = Env(train_env=LocalEnv())
+        else:
+            env = Env()
+    elif ENV_CHOICE == "p":
+        import _paths  # noqa: F401  (puts the repository root on sys.path)
+        from TE.env_pool import SimEnvPool as Env
+        env = Env(NUM_WORKERS)
+    elif ENV_CHOICE == "d":
+        # Every actor process creates its own simulator
+        env = None
+    else:
+        from environment import ServerEnv as Env
+        env = Env(BASE_URL)
+
+    # TensorFlow is imported only now: SimEnvPool forks its workers and
+    # forking a process with TensorFlow's thread pools loaded can deadlock
+    from agent import DQNAgent
+    agent = DQNAgent(str(MODEL_FILE) if MODEL_FILE.exists() else None)
+    checkpoints = Checkpointer(agent, str(CHECKPOINT_DIR))
+    resumed = checkpoints.restore()
+    if resumed:
+        print(f"Resumed from {resumed} (epsilon {agent.epsilon:.3f}, {len(agent.memory)} transitions)")
+    log_path = Path(__file__).with_name("rl_log.csv")
+    logger = Logger(str(log_path))
+    learner = None
+    if ASYNC_LEARNER and ENV_CHOICE != "d":
+        from learner import Learner
+        learner = Learner(agent)
+        learner.start()
+    try:
+        if ENV_CHOICE == "p":
+            train_batched(env, agent, logger, learner, checkpoints)
+        elif ENV_CHOICE == "d":
+            from distributed import train_distributed
+            train_distributed(agent, logger, checkpoints.maybe_save)
+        elif ENV_CHOICE == "r":
+            train_rollouts(env, agent, logger, learner, checkpoints)
+        else:
+            train(env, agent, logger, learner, checkpoints)
+    finally:
+        if hasattr(env, "close"):
+            env.close()
+        if learner is not None:
+            learner.stop()
+        checkpoints.close()
+        agent.save(str(MODEL_FILE))
+    logger.close()
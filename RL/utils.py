@@ -6,6 +6,8 @@ single step.  The driving component supports the basic motion commands while
 the camera angle can be set anywhere between -90 and 90 degrees (inclusive).
 """
 
+from config import CAMERA_STEP, FACTORIZED_ACTIONS
+
 # Basic driving commands
 DRIVE_ACTIONS = [
     "forward",
@@ -27,8 +29,48 @@ ACTIONS = [
 STATE_SIZE = 8
 ACTION_SIZE = len(ACTIONS)
 
+# The agent may choose the camera angle on a coarser grid and predict the
+# drive and camera values with separate output heads (see ``config.py``).
+# Actions passed to the environments are always indices into ``ACTIONS``.
+AGENT_CAMERA_ANGLES = CAMERA_ANGLES[::CAMERA_STEP]
+if FACTORIZED_ACTIONS:
+    OUTPUT_SIZE = len(DRIVE_ACTIONS) + len(AGENT_CAMERA_ANGLES)
+else:
+    OUTPUT_SIZE = len(DRIVE_ACTIONS) * len(AGENT_CAMERA_ANGLES)
+
+
+def action_index(drive, camera):
+    """Index into ``ACTIONS`` of a drive command and an agent camera angle.
+
+    ``drive`` indexes ``DRIVE_ACTIONS`` and ``camera`` indexes
+    ``AGENT_CAMERA_ANGLES``; both may be NumPy arrays.
+    """
+    return drive * len(CAMERA_ANGLES) + camera * CAMERA_STEP
+
+
+def split_action(idx):
+    """Inverse of :func:`action_index`."""
+    return idx // len(CAMERA_ANGLES), (idx % len(CAMERA_ANGLES)) // CAMERA_STEP
+
 
 def format_action(action):
     """Return a readable representation of an action tuple."""
     drive, angle = action
     return f"{drive}|cam_{angle}"
+
+
+def termination_reason(done, battery_empty, goal_reached, crashed, coverage_done, stalled):
+    """Why an episode ended, as logged by every training loop."""
+    if not done:
+        return "Max. Schritte"
+    if battery_empty:
+        return "Batterie leer"
+    if goal_reached:
+        return "Ziel erreicht"
+    if crashed:
+        return "Crash"
+    if coverage_done:
+        return "95% Abdeckung"
+    if stalled:
+        return "Stall"
+    return "Unbekannt"
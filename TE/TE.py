@@ -10,10 +10,18 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from abc import ABC, abstractmethod
+import hashlib
 import math
+import socket
+import socketserver
+import struct
+import threading
 import time
 import os
-from typing import List, Tuple, Optional
+import uuid
+from typing import Dict, List, Sequence, Tuple, Optional, Union
+
+import numpy as np
 
 
 # === Base Interface ========================================================
@@ -38,16 +46,27 @@ class Environment(ABC):
 # === Map Objects ===========================================================
 @dataclass
 class Obstacle:
+    """Axis aligned rectangle.  ``height`` defaults to ``size`` (a square)."""
+
     x: float
     y: float
     size: float
+    height: Optional[float] = None
+
+    def __post_init__(self) -> None:
+        if self.height is None:
+            self.height = self.size
+
+    @property
+    def width(self) -> float:
+        return self.size
 
     def intersects_rect(self, x: float, y: float, w: float, h: float) -> bool:
         return not (
             x + w < self.x
             or x > self.x + self.size
             or y + h < self.y
-            or y > self.y + self.size
+            or y > self.y + self.height
         )
 
 
@@ -85,18 +104,50 @@ class Waypoint:
 
 
 class GameMap:
-    """Simple map consisting of obstacles, waypoints and a target."""
+    """Simple map consisting of obstacles, waypoints and a target.
+
+    Obstacles are additionally stored in a uniform grid of buckets with an
+    edge length of ``index_cell_size`` pixels.  Collision queries only visit
+    the buckets covered by the query rectangle instead of every obstacle on
+    the map.  Assigning a new list to :attr:`obstacles` rebuilds the index;
+    after changing the list or an obstacle in place, call :meth:`build_index`
+    before the next query.  The map keeps an ``(N, 4)`` array of obstacle
+    rectangles which is used to cast sensor rays in one vectorised step.
+    Maps created by :meth:`from_array` only hold that array; the
+    :class:`Obstacle` list and the buckets are created on first use.
+    """
+
+    INDEX_CELL_SIZE = 50.0
+    # Compiled maps are stored in this directory next to the CSV file
+    CACHE_DIR = ".map_cache"
+    CACHE_VERSION = 1
 
     def __init__(self, cols: int, rows: int, cell_size: float = 40, margin: float = 0) -> None:
         self.cols = cols
         self.rows = rows
         self.cell_size = cell_size
         self.margin = margin
-        self.obstacles: List[Obstacle] = []
+        self._obstacles: Optional[List[Obstacle]] = []
         self.waypoints: List[Waypoint] = []
         self.target: Optional[Target] = None
         self.startX = 0.0
         self.startY = 0.0
+        self.index_cell_size = self.INDEX_CELL_SIZE
+        self._index: Optional[Dict[Tuple[int, int], List[Tuple[float, float, float, float]]]] = None
+        self._grid: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None
+        self._rects = np.zeros((0, 4))
+        self._free: Optional[np.ndarray] = None
+
+    @property
+    def obstacles(self) -> List[Obstacle]:
+        if self._obstacles is None:
+            self._obstacles = [Obstacle(*row) for row in self._rects.tolist()]
+        return self._obstacles
+
+    @obstacles.setter
+    def obstacles(self, obstacles: List[Obstacle]) -> None:
+        self._obstacles = obstacles
+        self.build_index()
 
     @property
     def width(self) -> float:
@@ -108,10 +159,34 @@ class GameMap:
 
     # ------------------------------------------------------------------
     @staticmethod
-    def from_csv(path: str) -> "GameMap":
-        """Load map information from a CSV file."""
-        with open(path, "r", encoding="utf-8") as fh:
-            lines = [ln.strip() for ln in fh.readlines() if ln.strip()]
+    def from_csv(path: str, coalesce: bool = False, cache: bool = False) -> "GameMap":
+        """Load map information from a CSV file.
+
+        With ``coalesce`` the obstacle squares are merged into larger
+        rectangles, see :meth:`coalesce_obstacles`.  With ``cache`` the parsed
+        map is compiled into a binary file in ``.map_cache/`` next to the CSV,
+        keyed by the hash of the CSV content (see :meth:`to_array`).  Later
+        loads memory-map that file instead of parsing the text again; a
+        damaged cache file is rebuilt.
+        """
+        with open(path, "rb") as fh:
+            raw = fh.read()
+        cache_file = None
+        if cache:
+            key = f"{GameMap.CACHE_VERSION}:{int(coalesce)}:".encode() + raw
+            stem = os.path.splitext(os.path.basename(path))[0]
+            cache_file = os.path.join(
+                os.path.dirname(os.path.abspath(path)),
+                GameMap.CACHE_DIR,
+                f"{stem}-{hashlib.sha1(key).hexdigest()[:16]}.npy",
+            )
+            if os.path.exists(cache_file):
+                try:
+                    return GameMap.from_array(np.load(cache_file, mmap_mode="r"))
+                except Exception:
+                    # Truncated or otherwise damaged; parse the CSV again
+                    pass
+        lines = [ln.strip() for ln in raw.decode("utf-8").splitlines() if ln.strip()]
         cols, rows, cell, margin = map(float, lines[0].split(","))
         gm = GameMap(int(cols), int(rows), cell, margin)
         for ln in lines[1:]:
@@ -127,8 +202,329 @@ class GameMap:
                 gm.waypoints.append(Waypoint(float(parts[1]), float(parts[2]), float(parts[3])))
             elif kind == "obstacle" and len(parts) >= 4:
                 gm.obstacles.append(Obstacle(float(parts[1]), float(parts[2]), float(parts[3])))
+        if coalesce:
+            gm.coalesce_obstacles()
+        gm.build_index()
+        if cache_file:
+            gm._write_cache(cache_file)
         return gm
 
+    # ------------------------------------------------------------------
+    def to_array(self) -> np.ndarray:
+        """Encode the map as a ``(K, 4)`` float array.
+
+        Row 0 holds ``cols, rows, cell_size, margin``, row 1 ``startX,
+        startY, has_target, number of waypoints`` and row 2 the target
+        ``x, y, size``.  The waypoints ``x, y, size`` and finally the
+        obstacles ``x, y, width, height`` follow one per row.
+        """
+        t = self.target
+        head = [
+            (self.cols, self.rows, self.cell_size, self.margin),
+            (self.startX, self.startY, 1.0 if t else 0.0, len(self.waypoints)),
+            (t.x, t.y, t.size, 0.0) if t else (0.0, 0.0, 0.0, 0.0),
+        ]
+        head.extend((w.x, w.y, w.size, 0.0) for w in self.waypoints)
+        return np.concatenate([np.array(head, dtype=np.float64), self._rects])
+
+    @staticmethod
+    def from_array(data: np.ndarray) -> "GameMap":
+        """Create a map from the output of :meth:`to_array`.
+
+        The obstacle rows of ``data`` are used directly as the rectangle
+        array of the map, so a memory-mapped file is not copied.  Raises
+        ``ValueError`` if ``data`` does not have the layout of
+        :meth:`to_array`.
+        """
+        if data.ndim != 2 or data.shape[1] != 4 or len(data) < 3:
+            raise ValueError(f"invalid map array of shape {data.shape}")
+        cols, rows, cell, margin = data[0].tolist()
+        start_x, start_y, has_target, n_waypoints = data[1].tolist()
+        first = 3 + int(n_waypoints)
+        if not 0 <= n_waypoints <= len(data) - 3 or cols < 0 or rows < 0:
+            raise ValueError("invalid map array header")
+        gm = GameMap(int(cols), int(rows), cell, margin)
+        gm.startX = start_x
+        gm.startY = start_y
+        if has_target:
+            gm.target = Target(*data[2, :3].tolist())
+        gm.waypoints = [Waypoint(*row[:3]) for row in data[3:first].tolist()]
+        gm._obstacles = None
+        gm.build_index(data[first:])
+        return gm
+
+    def _write_cache(self, cache_file: str) -> None:
+        # Write to a temporary file first so concurrent loaders never see a
+        # partially written cache.
+        tmp = f"{cache_file}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+            with open(tmp, "wb") as fh:
+                np.save(fh, self.to_array())
+            os.replace(tmp, cache_file)
+        except OSError:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+
+    # ------------------------------------------------------------------
+    def coalesce_obstacles(self) -> None:
+        """Replace the obstacles by a small set of rectangles covering them.
+
+        All obstacle edges span a compressed grid whose cells are either fully
+        covered or free.  Covered cells are merged into horizontal runs and
+        runs spanning the same columns in consecutive rows are joined.  The
+        union of the resulting rectangles equals the union of the original
+        obstacles, so collision checks and rays cast from outside an obstacle
+        give the same results.  Degenerate obstacles without area are kept.
+        """
+        solid: List[Obstacle] = []
+        merged: List[Obstacle] = []
+        for o in self.obstacles:
+            (solid if o.size > 0 and o.height > 0 else merged).append(o)
+        if not solid:
+            self.obstacles = merged
+            return
+        xs = np.unique([v for o in solid for v in (o.x, o.x + o.size)])
+        ys = np.unique([v for o in solid for v in (o.y, o.y + o.height)])
+        covered = np.zeros((len(ys) - 1, len(xs) - 1), dtype=bool)
+        for o in solid:
+            i0, i1 = np.searchsorted(xs, (o.x, o.x + o.size))
+            j0, j1 = np.searchsorted(ys, (o.y, o.y + o.height))
+            covered[j0:j1, i0:i1] = True
+
+        # (first column, end column) -> first row of a rectangle still growing
+        open_runs: Dict[Tuple[int, int], int] = {}
+
+        def close(run: Tuple[int, int], start: int, end: int) -> None:
+            x0, x1 = xs[run[0]], xs[run[1]]
+            y0, y1 = ys[start], ys[end]
+            merged.append(Obstacle(float(x0), float(y0), float(x1 - x0), float(y1 - y0)))
+
+        for j, row in enumerate(covered):
+            edges = np.flatnonzero(np.diff(np.concatenate(([False], row, [False]))))
+            runs = set(zip(edges[::2].tolist(), edges[1::2].tolist()))
+            for run in [r for r in open_runs if r not in runs]:
+                close(run, open_runs.pop(run), j)
+            for run in runs:
+                open_runs.setdefault(run, j)
+        for run, start in open_runs.items():
+            close(run, start, len(covered))
+        self.obstacles = merged
+
+    # ------------------------------------------------------------------
+    def _cell_range(self, lo: float, hi: float) -> range:
+        size = self.index_cell_size
+        return range(math.floor(lo / size), math.floor(hi / size) + 1)
+
+    def build_index(self, rects: Optional[np.ndarray] = None) -> None:
+        """Update the rectangle array after the obstacles changed.
+
+        ``rects`` may provide the ``(N, 4)`` rectangle array matching
+        :attr:`obstacles`; otherwise it is built from the obstacle list.  The
+        buckets of the spatial index are filled on the next
+        :meth:`collides` call.
+        """
+        if rects is None:
+            rects = np.array(
+                [(o.x, o.y, o.size, o.height) for o in self.obstacles], dtype=np.float64
+            ).reshape(-1, 4)
+        self._index = None
+        self._grid = None
+        self._rects = rects
+        self._free = None
+
+    def _bucket_bounds(self, x: np.ndarray, y: np.ndarray, w: np.ndarray, h: np.ndarray) -> Tuple[np.ndarray, ...]:
+        """First and last bucket column and row ``(cx0, cx1, cy0, cy1)`` of boxes."""
+        size = self.index_cell_size
+        return tuple(np.floor(v / size).astype(np.int64) for v in (x, x + w, y, y + h))
+
+    @staticmethod
+    def _expand_buckets(cx0: np.ndarray, cx1: np.ndarray, cy0: np.ndarray, cy1: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """List every bucket covered by each box as ``(box index, bucket key)``."""
+        ny = cy1 - cy0 + 1
+        counts = (cx1 - cx0 + 1) * ny
+        owner = np.repeat(np.arange(len(counts)), counts)
+        local = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        cx = cx0[owner] + local // ny[owner]
+        cy = cy0[owner] + local % ny[owner]
+        return owner, (cx << 32) + (cy & 0xFFFFFFFF)
+
+    def _bucket_arrays(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Spatial index as arrays for vectorised queries.
+
+        Returns the sorted bucket keys, the offsets of each bucket into the
+        obstacle list (plus the end offset) and that list of obstacle rows.
+        """
+        if self._grid is None:
+            r = self._rects
+            owner, keys = self._expand_buckets(*self._bucket_bounds(r[:, 0], r[:, 1], r[:, 2], r[:, 3]))
+            order = np.argsort(keys, kind="stable")
+            keys = keys[order]
+            uniq, start = np.unique(keys, return_index=True)
+            self._grid = (uniq, np.append(start, len(keys)), owner[order])
+        return self._grid
+
+    def _buckets(self) -> Dict[Tuple[int, int], List[Tuple[float, float, float, float]]]:
+        """Obstacle bounds ``(x0, y0, x1, y1)`` per bucket of the spatial index."""
+        if self._index is not None:
+            return self._index
+        rects = self._rects
+        size = self.index_cell_size
+        bounds = np.floor(
+            np.stack(
+                [
+                    rects[:, 0] / size,
+                    (rects[:, 0] + rects[:, 2]) / size,
+                    rects[:, 1] / size,
+                    (rects[:, 1] + rects[:, 3]) / size,
+                ],
+                axis=1,
+            )
+        ).astype(np.int64)
+        index: Dict[Tuple[int, int], List[Tuple[float, float, float, float]]] = {}
+        for (x, y, w, h), (cx0, cx1, cy0, cy1) in zip(rects.tolist(), bounds.tolist()):
+            box = (x, y, x + w, y + h)
+            for cx in range(cx0, cx1 + 1):
+                for cy in range(cy0, cy1 + 1):
+                    index.setdefault((cx, cy), []).append(box)
+        self._index = index
+        return index
+
+    @property
+    def free_mask(self) -> np.ndarray:
+        """``(rows, cols)`` grid which is ``True`` for cells without obstacles.
+
+        A cell counts as blocked when an obstacle covers part of its area.
+        The grid is computed once per obstacle layout.
+        """
+        if self._free is None:
+            c = self.cell_size
+            r = self._rects
+            x0 = np.clip(np.floor(r[:, 0] / c), 0, self.cols).astype(np.int64)
+            x1 = np.clip(np.ceil((r[:, 0] + r[:, 2]) / c), 0, self.cols).astype(np.int64)
+            y0 = np.clip(np.floor(r[:, 1] / c), 0, self.rows).astype(np.int64)
+            y1 = np.clip(np.ceil((r[:, 1] + r[:, 3]) / c), 0, self.rows).astype(np.int64)
+            # 2D difference array: each rectangle adds one to its cells
+            diff = np.zeros((self.rows + 1, self.cols + 1), dtype=np.int32)
+            np.add.at(diff, (y0, x0), 1)
+            np.add.at(diff, (y0, x1), -1)
+            np.add.at(diff, (y1, x0), -1)
+            np.add.at(diff, (y1, x1), 1)
+            covered = diff.cumsum(axis=0).cumsum(axis=1)[: self.rows, : self.cols] > 0
+            self._free = ~covered
+        return self._free
+
+    @property
+    def free_cells(self) -> int:
+        """Number of grid cells not covered by an obstacle."""
+        return int(np.count_nonzero(self.free_mask))
+
+    def collides(self, x: float, y: float, w: float, h: float) -> bool:
+        """Return ``True`` if any obstacle intersects the given rectangle."""
+        index = self._buckets()
+        for cx in self._cell_range(x, x + w):
+            for cy in self._cell_range(y, y + h):
+                for x0, y0, x1, y1 in index.get((cx, cy), ()):
+                    if not (x + w < x0 or x > x1 or y + h < y0 or y > y1):
+                        return True
+        return False
+
+    def collides_batch(self, x: np.ndarray, y: np.ndarray, w: np.ndarray, h: np.ndarray) -> np.ndarray:
+        """Vectorised :meth:`collides` for arrays of rectangles.
+
+        Each rectangle is only tested against the obstacles in the buckets
+        it covers, no matter how far apart the rectangles are.
+        """
+        x, y, w, h = (np.asarray(v, dtype=np.float64) for v in (x, y, w, h))
+        hit = np.zeros(len(x), dtype=bool)
+        keys, starts, ids = self._bucket_arrays()
+        if not len(keys):
+            return hit
+        box, query = self._expand_buckets(*self._bucket_bounds(x, y, w, h))
+        pos = np.minimum(np.searchsorted(keys, query), len(keys) - 1)
+        found = keys[pos] == query
+        box, pos = box[found], pos[found]
+        # Candidate (box, obstacle) pairs from the matching buckets
+        counts = starts[pos + 1] - starts[pos]
+        box = np.repeat(box, counts)
+        offsets = np.repeat(starts[pos] - (np.cumsum(counts) - counts), counts)
+        rects = self._rects[ids[offsets + np.arange(counts.sum())]]
+        ok = ~(
+            (x[box] + w[box] < rects[:, 0])
+            | (x[box] > rects[:, 0] + rects[:, 2])
+            | (y[box] + h[box] < rects[:, 1])
+            | (y[box] > rects[:, 1] + rects[:, 3])
+        )
+        hit[box[ok]] = True
+        return hit
+
+    def _rects_near(self, x0: float, y0: float, x1: float, y1: float, target: bool = True) -> np.ndarray:
+        """Return obstacle rectangles (and the target) touching the given box."""
+        rects = self._rects
+        if len(rects):
+            near = (
+                (rects[:, 0] + rects[:, 2] >= x0)
+                & (rects[:, 0] <= x1)
+                & (rects[:, 1] + rects[:, 3] >= y0)
+                & (rects[:, 1] <= y1)
+            )
+            rects = rects[near]
+        if target and self.target:
+            t = self.target
+            rects = np.vstack([rects, [(t.x, t.y, t.size, t.size)]])
+        return rects
+
+    def cast_rays(self, fx: float, fy: float, angles: Sequence[float], max_range: float = 150.0) -> np.ndarray:
+        """Return the distance to the closest obstacle or target for each ray.
+
+        All rays start at ``(fx, fy)``.  Only rectangles within ``max_range``
+        of the origin are tested and every ray is intersected with all of them
+        at once.  Rays that do not hit anything report ``max_range``.
+        """
+        rects = self._rects_near(fx - max_range, fy - max_range, fx + max_range, fy + max_range)
+        cos = np.array([math.cos(a) for a in angles])
+        sin = np.array([math.sin(a) for a in angles])
+        return self._cast(fx, fy, cos, sin, rects, max_range)
+
+    def cast_rays_batch(self, fx: np.ndarray, fy: np.ndarray, angles: np.ndarray, max_range: float = 150.0) -> np.ndarray:
+        """Cast ``(N, R)`` rays from ``N`` origins and return their distances."""
+        fx = np.asarray(fx, dtype=np.float64)[:, np.newaxis]
+        fy = np.asarray(fy, dtype=np.float64)[:, np.newaxis]
+        rects = self._rects_near(
+            fx.min() - max_range, fy.min() - max_range, fx.max() + max_range, fy.max() + max_range
+        )
+        return self._cast(fx, fy, np.cos(angles), np.sin(angles), rects, max_range)
+
+    @staticmethod
+    def _cast(fx, fy, cos: np.ndarray, sin: np.ndarray, rects: np.ndarray, max_range: float) -> np.ndarray:
+        best = np.full(cos.shape, float(max_range))
+        if not len(rects):
+            return best
+        # Rays span all but the last axis, rectangles the last one.
+        fx = np.asarray(fx)[..., np.newaxis]
+        fy = np.asarray(fy)[..., np.newaxis]
+        cos = cos[..., np.newaxis]
+        sin = sin[..., np.newaxis]
+        x0, y0 = rects[:, 0], rects[:, 1]
+        x1, y1 = x0 + rects[:, 2], y0 + rects[:, 3]
+        use_x = np.abs(cos) > 1e-6
+        use_y = np.abs(sin) > 1e-6
+        safe_cos = np.where(use_x, cos, 1.0)
+        safe_sin = np.where(use_y, sin, 1.0)
+        for edge in (x0, x1):
+            t = (edge - fx) / safe_cos
+            y = fy + t * sin
+            hit = use_x & (t >= 0) & (y0 <= y) & (y <= y1)
+            best = np.minimum(best, np.where(hit, t, np.inf).min(axis=-1))
+        for edge in (y0, y1):
+            t = (edge - fy) / safe_sin
+            x = fx + t * cos
+            hit = use_y & (t >= 0) & (x0 <= x) & (x <= x1)
+            best = np.minimum(best, np.where(hit, t, np.inf).min(axis=-1))
+        return best
+
     # ------------------------------------------------------------------
     def in_bounds(self, x: float, y: float, w: float = 0, h: float = 0) -> bool:
         return (
@@ -141,12 +537,25 @@ class GameMap:
 
 # === Car ===================================================================
 class Car:
-    """Replicates the car behaviour of the JS simulator."""
+    """Replicates the car behaviour of the JS simulator.
+
+    By default the battery drains according to the wall-clock time between
+    two calls of :meth:`update`.  When ``tick`` is given the car runs on a
+    simulated clock instead which advances by ``tick`` seconds per update, so
+    trajectories do not depend on how fast the host executes the steps.
+    """
 
     BATTERY_RATE = 0.000005
 
-    def __init__(self, game_map: GameMap, hitbox_width: float = 40, hitbox_height: float = 60) -> None:
+    def __init__(
+        self,
+        game_map: GameMap,
+        hitbox_width: float = 40,
+        hitbox_height: float = 60,
+        tick: Optional[float] = None,
+    ) -> None:
         self.map = game_map
+        self.tick = tick
         self.hitbox_width = hitbox_width
         self.hitbox_height = hitbox_height
         self.wheel_base = 50
@@ -156,6 +565,7 @@ class Car:
         self.max_rpm = 5000
         self.max_steering = math.radians(60)
         self.steer_rate = 0.015
+        self.sensor_range = 150.0
         self.reset()
 
     # ------------------------------------------------------------------
@@ -171,9 +581,17 @@ class Car:
         self.gyro = 180.0
         self.battery = 1.0
         self.crashed = False
-        self.last_update = time.time()
+        self.sim_time = 0.0
+        self.last_update = self.now()
         self._last_drive = "stop"
 
+    # ------------------------------------------------------------------
+    def now(self) -> float:
+        """Return the current time in seconds, simulated if ``tick`` is set."""
+        if self.tick is None:
+            return time.time()
+        return self.sim_time
+
     # ------------------------------------------------------------------
     def _bounding_box(self, x: float, y: float, rotation: Optional[float] = None) -> Tuple[float, float, float, float]:
         if rotation is None:
@@ -199,52 +617,26 @@ class Car:
 
     # ------------------------------------------------------------------
     def _collides(self, bbox: Tuple[float, float, float, float]) -> bool:
-        for o in self.map.obstacles:
-            if o.intersects_rect(*bbox):
-                return True
-        return False
+        return self.map.collides(*bbox)
 
     # ------------------------------------------------------------------
-    def _ray_rect_intersection(self, fx: float, fy: float, angle: float, rect: Tuple[float, float, float, float]) -> float:
-        rx, ry, rw, rh = rect
-        cos = math.cos(angle)
-        sin = math.sin(angle)
-        min_t = float("inf")
-        if abs(cos) > 1e-6:
-            for rx_edge in (rx, rx + rw):
-                t = (rx_edge - fx) / cos
-                if t >= 0:
-                    y = fy + t * sin
-                    if ry <= y <= ry + rh:
-                        min_t = min(min_t, t)
-        if abs(sin) > 1e-6:
-            for ry_edge in (ry, ry + rh):
-                t = (ry_edge - fy) / sin
-                if t >= 0:
-                    x = fx + t * cos
-                    if rx <= x <= rx + rw:
-                        min_t = min(min_t, t)
-        return min_t
+    def _cast_distance(self, angle: float, length: Optional[float] = None) -> float:
+        return float(self.scan_angles([angle], length)[0])
 
     # ------------------------------------------------------------------
-    def _cast_distance(self, angle: float, length: float = 150.0) -> float:
+    def scan_angles(self, angles: Sequence[float], length: Optional[float] = None) -> np.ndarray:
+        """Cast rays in the given absolute directions from the car's centre."""
         fx = self.pos_x + self.hitbox_width / 2
         fy = self.pos_y + self.hitbox_height / 2
-        best = length
-        objs: List[Tuple[float, float, float, float]] = [
-            (o.x, o.y, o.size, o.size) for o in self.map.obstacles
-        ]
-        if self.map.target:
-            objs.append((self.map.target.x, self.map.target.y, self.map.target.size, self.map.target.size))
-        for rect in objs:
-            dist = self._ray_rect_intersection(fx, fy, angle, rect)
-            if dist < best:
-                best = dist
-        return best
+        if length is None:
+            length = self.sensor_range
+        return self.map.cast_rays(fx, fy, angles, length)
 
     # ------------------------------------------------------------------
     def update(self, action: str) -> None:
-        now = time.time()
+        if self.tick is not None:
+            self.sim_time += self.tick
+        now = self.now()
         dt = now - self.last_update
         self.last_update = now
 
@@ -320,11 +712,22 @@ class Car:
 
     # ------------------------------------------------------------------
     def distances(self) -> Tuple[float, float, float, float]:
-        front = self._cast_distance(self.rotation + math.pi)
-        left = self._cast_distance(self.rotation + math.pi / 2)
-        right = self._cast_distance(self.rotation - math.pi / 2)
-        rear = self._cast_distance(self.rotation)
-        return front, left, right, rear
+        front, left, right, rear = self.scan_angles(
+            [
+                self.rotation + math.pi,
+                self.rotation + math.pi / 2,
+                self.rotation - math.pi / 2,
+                self.rotation,
+            ]
+        )
+        return float(front), float(left), float(right), float(rear)
+
+    # ------------------------------------------------------------------
+    def lidar(self, num_rays: int, max_range: Optional[float] = None) -> np.ndarray:
+        """Return ``num_rays`` evenly spaced distances starting at the front."""
+        front = self.rotation + math.pi
+        step = 2 * math.pi / num_rays if num_rays else 0.0
+        return self.scan_angles([front + i * step for i in range(num_rays)], max_range)
 
 
 # === Environment ===========================================================
@@ -350,21 +753,59 @@ ACTIONS = [
 ]
 
 
-class SimEnv(Environment):
-    """Headless simulator built on top of :class:`Car` and :class:`GameMap`."""
+def action_index(drive: int, camera: int, camera_step: int = 1) -> int:
+    """Index into ``ACTIONS`` for a drive command and a camera angle.
 
-    def __init__(self, map_file: str = "Virtaul_Ares\TE\Level1.csv") -> None:
+    ``camera`` indexes the coarser grid ``CAMERA_ANGLES[::camera_step]`` used
+    by agents with a quantized camera.
+    """
+    return drive * len(CAMERA_ANGLES) + camera * camera_step
+
+
+class SimEnv(Environment):
+    """Headless simulator built on top of :class:`Car` and :class:`GameMap`.
+
+    ``lidar_rays`` appends that many evenly spaced distance readings of range
+    ``lidar_range`` to the state returned by :meth:`get_state`.  With
+    ``coalesce`` the obstacles of the map are merged into rectangles on load.
+    ``tick`` switches the car and the stall detection to a simulated clock
+    advancing by that many seconds per step (see :class:`Car`).  An already
+    loaded ``game_map`` may be passed to share it between environments; it
+    is never modified by the simulation.  ``map_cache`` loads the map through
+    the compiled map cache (see :meth:`GameMap.from_csv`).
+    """
+
+    STALL_TIMEOUT = 10.0
+
+    def __init__(
+        self,
+        map_file: str = "Virtaul_Ares\TE\Level1.csv",
+        lidar_rays: int = 0,
+        lidar_range: float = 150.0,
+        coalesce: bool = False,
+        tick: Optional[float] = None,
+        game_map: Optional[GameMap] = None,
+        map_cache: bool = False,
+    ) -> None:
         self.map_file = map_file
         self.map_name = os.path.splitext(os.path.basename(map_file))[0]
-        self.map = GameMap.from_csv(map_file)
-        self.car = Car(self.map)
+        self.map = game_map or GameMap.from_csv(map_file, coalesce=coalesce, cache=map_cache)
+        self.car = Car(self.map, tick=tick)
+        self.lidar_rays = lidar_rays
+        self.lidar_range = lidar_range
         self.done = False
         self.goal_reached = False
         self.stalled = False
         self.coverage_done = False
-        self._visited: set[tuple[int, int]] = set()
+        # Cells visited in the current episode hold the current generation.
+        # Incrementing the generation therefore clears the map in O(1).
+        self._visited = np.zeros((self.map.rows, self.map.cols), dtype=np.uint16)
+        self._generation = 0
+        self._visited_count = 0
+        self._free = self.map.free_mask
+        self._free_cells = self.map.free_cells
         self.coverage = 0.0
-        self._last_move = time.time()
+        self._last_move = self.car.now()
 
     # ------------------------------------------------------------------
     def reset(self) -> List[float]:
@@ -373,22 +814,27 @@ class SimEnv(Environment):
         self.goal_reached = False
         self.stalled = False
         self.coverage_done = False
-        self._visited.clear()
+        self._generation += 1
+        if self._generation > np.iinfo(self._visited.dtype).max:
+            self._visited.fill(0)
+            self._generation = 1
+        self._visited_count = 0
         self.coverage = 0.0
-        self._last_move = time.time()
+        self._last_move = self.car.now()
         self._update_coverage()
         return self.get_state()
 
     # ------------------------------------------------------------------
-    def send_action(self, action_index: int) -> None:
-        drive, _angle = ACTIONS[action_index]
+    def send_action(self, action: Union[int, Tuple[str, int]]) -> None:
+        """Apply an index into ``ACTIONS`` or a ``(drive, angle)`` tuple."""
+        drive, _angle = action if isinstance(action, tuple) else ACTIONS[action]
         # The simulator does not model the second camera, so only the driving
         # command influences the state.  The camera angle component is ignored.
         self.car.update(drive)
         self._update_coverage()
         if self.car.speed > 0:
-            self._last_move = time.time()
-        elif time.time() - self._last_move > 10:
+            self._last_move = self.car.now()
+        elif self.car.now() - self._last_move > self.STALL_TIMEOUT:
             self.stalled = True
             self.done = True
         self._check_goal()
@@ -403,7 +849,7 @@ class SimEnv(Environment):
     # ------------------------------------------------------------------
     def get_state(self) -> List[float]:
         front, left, right, _rear = self.car.distances()
-        return [
+        state = [
             front,
             left,
             right,
@@ -413,6 +859,9 @@ class SimEnv(Environment):
             self.coverage,
             self.car.battery,
         ]
+        if self.lidar_rays:
+            state.extend(self.car.lidar(self.lidar_rays, self.lidar_range).tolist())
+        return state
 
     # ------------------------------------------------------------------
     def compute_reward(self, prev_state: List[float], new_state: List[float]) -> float:
@@ -430,9 +879,12 @@ class SimEnv(Environment):
     def _update_coverage(self) -> None:
         cell_x = int(self.car.pos_x / self.map.cell_size)
         cell_y = int(self.car.pos_y / self.map.cell_size)
-        self._visited.add((cell_x, cell_y))
-        total = self.map.cols * self.map.rows
-        self.coverage = len(self._visited) / total if total else 0.0
+        if not (0 <= cell_x < self.map.cols and 0 <= cell_y < self.map.rows):
+            return
+        if self._free[cell_y, cell_x] and self._visited[cell_y, cell_x] != self._generation:
+            self._visited[cell_y, cell_x] = self._generation
+            self._visited_count += 1
+            self.coverage = self._visited_count / self._free_cells if self._free_cells else 0.0
 
     # ------------------------------------------------------------------
     def _check_goal(self) -> None:
@@ -444,76 +896,531 @@ class SimEnv(Environment):
             self.done = True
 
 
+# === Rollouts ==============================================================
+def dense_forward(layers: Sequence[Tuple[np.ndarray, np.ndarray]], x: np.ndarray) -> np.ndarray:
+    """Evaluate Dense layers given as ``(kernel, bias)`` pairs.
+
+    Hidden layers use ReLU and the last layer is linear.  ``x`` may be a
+    single state or a batch of states.
+    """
+    x = np.asarray(x, dtype=np.float32)
+    for i, (w, b) in enumerate(layers):
+        x = x @ w + b
+        if i < len(layers) - 1:
+            x = np.maximum(x, 0.0)
+    return x
+
+
+class DensePolicy:
+    """Epsilon-greedy policy evaluating a small dense network with NumPy.
+
+    ``weights`` is the list returned by ``keras.Model.get_weights()`` for a
+    stack of ``Dense`` layers, i.e. alternating kernels and biases.  Hidden
+    layers use ReLU and the output layer is linear, matching the network of
+    ``DQNAgent``.  Without weights every action is drawn at random.
+
+    The network chooses camera angles from ``CAMERA_ANGLES[::camera_step]``.
+    Its outputs are either one Q-value per drive/camera combination or, with
+    ``factorized``, the drive Q-values followed by the camera Q-values.
+    :meth:`act` always returns an index into ``ACTIONS``.  ``seed`` may be
+    a ``np.random.Generator`` which is then used as is.
+    """
+
+    def __init__(
+        self,
+        weights: Sequence[np.ndarray] = (),
+        epsilon: float = 0.0,
+        seed: Optional[Union[int, np.random.Generator]] = None,
+        camera_step: int = 1,
+        factorized: bool = False,
+    ) -> None:
+        self.layers = [
+            (np.asarray(w, dtype=np.float32), np.asarray(b, dtype=np.float32))
+            for w, b in zip(weights[::2], weights[1::2])
+        ]
+        self.epsilon = epsilon if self.layers else 1.0
+        self.camera_step = camera_step
+        self.factorized = factorized
+        self.num_cameras = len(CAMERA_ANGLES[::camera_step])
+        self.num_actions = len(DRIVE_ACTIONS) * self.num_cameras
+        self.rng = np.random.default_rng(seed)
+
+    def q_values(self, state: Sequence[float]) -> np.ndarray:
+        return dense_forward(self.layers, state)
+
+    def act(self, state: Sequence[float]) -> int:
+        if self.rng.random() <= self.epsilon:
+            drive, camera = divmod(int(self.rng.integers(self.num_actions)), self.num_cameras)
+        elif self.factorized:
+            q = self.q_values(state)
+            n = len(DRIVE_ACTIONS)
+            drive, camera = int(np.argmax(q[:n])), int(np.argmax(q[n:]))
+        else:
+            drive, camera = divmod(int(np.argmax(self.q_values(state))), self.num_cameras)
+        return action_index(drive, camera, self.camera_step)
+
+
+def run_episodes(env: SimEnv, policy: DensePolicy, episodes: int = 1, max_steps: int = 1000) -> Dict[str, np.ndarray]:
+    """Play ``episodes`` episodes and return the trajectory as arrays.
+
+    Per-step arrays are ``states``, ``actions``, ``rewards``,
+    ``next_states``, ``dones`` and ``episode`` (index of the episode).  The
+    per-episode arrays ``steps``, ``goal_reached``, ``crashed``, ``stalled``,
+    ``coverage_done`` and ``battery`` describe how each episode ended.
+    """
+    steps: Dict[str, list] = {k: [] for k in ("states", "actions", "rewards", "next_states", "dones", "episode")}
+    ends: Dict[str, list] = {k: [] for k in ("steps", "goal_reached", "crashed", "stalled", "coverage_done", "battery")}
+    for ep in range(episodes):
+        state = env.reset()
+        n = 0
+        for n in range(1, max_steps + 1):
+            action = policy.act(state)
+            env.send_action(action)
+            new_state = env.get_state()
+            steps["states"].append(state)
+            steps["actions"].append(action)
+            steps["rewards"].append(env.compute_reward(state, new_state))
+            steps["next_states"].append(new_state)
+            steps["dones"].append(env.done)
+            steps["episode"].append(ep)
+            state = new_state
+            if env.done:
+                break
+        ends["steps"].append(n)
+        ends["goal_reached"].append(env.goal_reached)
+        ends["crashed"].append(env.car.crashed)
+        ends["stalled"].append(env.stalled)
+        ends["coverage_done"].append(env.coverage_done)
+        ends["battery"].append(env.car.battery)
+    size = 8 + env.lidar_rays
+    return {
+        "states": np.array(steps["states"], dtype=np.float32).reshape(-1, size),
+        "actions": np.array(steps["actions"], dtype=np.int32),
+        "rewards": np.array(steps["rewards"], dtype=np.float32),
+        "next_states": np.array(steps["next_states"], dtype=np.float32).reshape(-1, size),
+        "dones": np.array(steps["dones"], dtype=bool),
+        "episode": np.array(steps["episode"], dtype=np.int32),
+        "steps": np.array(ends["steps"], dtype=np.int32),
+        "goal_reached": np.array(ends["goal_reached"], dtype=bool),
+        "crashed": np.array(ends["crashed"], dtype=bool),
+        "stalled": np.array(ends["stalled"], dtype=bool),
+        "coverage_done": np.array(ends["coverage_done"], dtype=bool),
+        "battery": np.array(ends["battery"], dtype=np.float32),
+    }
+
+
+# === Sessions ==============================================================
+class Session:
+    """Simulator owned by one client of the HTTP server.
+
+    ``options`` are the :class:`SimEnv` keyword arguments used again when
+    the session switches to another map.
+    """
+
+    def __init__(self, env: SimEnv, persistent: bool = False, options: Optional[dict] = None) -> None:
+        self.persistent = persistent
+        self.options = dict(options or {})
+        self.lock = threading.Lock()
+        self.last_used = time.monotonic()
+        self.load(env)
+
+    def load(self, env: SimEnv) -> None:
+        """Replace the simulator of the session and reset it."""
+        self.env = env
+        self.prev_state = env.reset()
+
+
+class SessionManager:
+    """Registry of independent :class:`SimEnv` sessions.
+
+    Sessions created from the same map file share one parsed
+    :class:`GameMap`.  Sessions that have not been used for ``idle_timeout``
+    seconds are evicted unless they were added as persistent.
+    """
+
+    def __init__(self, idle_timeout: float = 600.0) -> None:
+        self.idle_timeout = idle_timeout
+        self.sessions: Dict[str, Session] = {}
+        self._maps: Dict[Tuple[str, bool], GameMap] = {}
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    def get_map(self, map_file: str, coalesce: bool = False) -> GameMap:
+        """Return the shared :class:`GameMap` for ``map_file``.
+
+        Maps are loaded through the compiled map cache.
+        """
+        key = (os.path.abspath(map_file), coalesce)
+        with self._lock:
+            gm = self._maps.get(key)
+        if gm is None:
+            gm = GameMap.from_csv(map_file, coalesce=coalesce, cache=True)
+            with self._lock:
+                gm = self._maps.setdefault(key, gm)
+        return gm
+
+    def new_env(self, map_file: str, **env_kwargs) -> SimEnv:
+        """Create a :class:`SimEnv` on the shared map of ``map_file``."""
+        env_kwargs = dict(env_kwargs)
+        game_map = self.get_map(map_file, env_kwargs.pop("coalesce", False))
+        return SimEnv(map_file, game_map=game_map, **env_kwargs)
+
+    # ------------------------------------------------------------------
+    def add(
+        self,
+        env: SimEnv,
+        session_id: Optional[str] = None,
+        persistent: bool = False,
+        options: Optional[dict] = None,
+    ) -> str:
+        """Register ``env`` as a new session and return its id."""
+        self.evict_idle()
+        session_id = session_id or uuid.uuid4().hex
+        with self._lock:
+            self.sessions[session_id] = Session(env, persistent, options)
+        return session_id
+
+    def create(self, map_file: str, **env_kwargs) -> str:
+        """Create a session simulating ``map_file`` and return its id."""
+        return self.add(self.new_env(map_file, **env_kwargs), options=env_kwargs)
+
+    def get(self, session_id: str) -> Optional[Session]:
+        """Return the session and mark it as used, or ``None``."""
+        self.evict_idle()
+        with self._lock:
+            session = self.sessions.get(session_id)
+        if session is not None:
+            session.last_used = time.monotonic()
+        return session
+
+    def remove(self, session_id: str) -> bool:
+        with self._lock:
+            return self.sessions.pop(session_id, None) is not None
+
+    def evict_idle(self) -> List[str]:
+        """Drop all sessions idle for longer than ``idle_timeout``."""
+        limit = time.monotonic() - self.idle_timeout
+        with self._lock:
+            stale = [
+                sid
+                for sid, session in self.sessions.items()
+                if not session.persistent and session.last_used < limit
+            ]
+            for sid in stale:
+                del self.sessions[sid]
+        return stale
+
+
+# === Streaming transport ===================================================
+# Binary protocol of the socket endpoint.  Every request is an opcode byte
+# followed by an int32 argument:
+#   b"S" <action>   step with the given action index
+#   b"R" 0          reset the episode
+#   b"B" <n>        bind the connection to a session; followed by ``n`` bytes
+#                   holding the session id
+# Every request is answered by a reply header (flags, number of state values,
+# reward, battery, coverage) followed by the state as float32 values.
+STREAM_REQUEST = struct.Struct("<ci")
+STREAM_REPLY = struct.Struct("<BHfff")
+FLAG_DONE = 1
+FLAG_GOAL = 2
+FLAG_CRASHED = 4
+FLAG_STALLED = 8
+FLAG_COVERAGE = 16
+FLAG_ERROR = 128
+
+
+def encode_reply(env: SimEnv, state: Sequence[float], reward: float) -> bytes:
+    flags = (
+        (FLAG_DONE if env.done else 0)
+        | (FLAG_GOAL if env.goal_reached else 0)
+        | (FLAG_CRASHED if env.car.crashed else 0)
+        | (FLAG_STALLED if env.stalled else 0)
+        | (FLAG_COVERAGE if env.coverage_done else 0)
+    )
+    header = STREAM_REPLY.pack(flags, len(state), reward, env.car.battery, env.coverage)
+    return header + np.asarray(state, dtype="<f4").tobytes()
+
+
+def recv_exact(sock: socket.socket, size: int) -> bytes:
+    """Read exactly ``size`` bytes or raise ``ConnectionError``."""
+    buf = bytearray()
+    while len(buf) < size:
+        chunk = sock.recv(size - len(buf))
+        if not chunk:
+            raise ConnectionError("connection closed")
+        buf += chunk
+    return bytes(buf)
+
+
+class _StreamHandler(socketserver.BaseRequestHandler):
+    def handle(self) -> None:
+        sock = self.request
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sessions: SessionManager = self.server.sessions
+        session_id = self.server.default_session
+        error = STREAM_REPLY.pack(FLAG_ERROR, 0, 0.0, 0.0, 0.0)
+        while True:
+            try:
+                op, arg = STREAM_REQUEST.unpack(recv_exact(sock, STREAM_REQUEST.size))
+                if op == b"B":
+                    # Stay bound to the previous session if the id is unknown
+                    try:
+                        requested = recv_exact(sock, arg).decode()
+                    except UnicodeDecodeError:
+                        requested = None
+                    if requested is None or sessions.get(requested) is None:
+                        sock.sendall(error)
+                        continue
+                    session_id = requested
+                elif op == b"S" and not 0 <= arg < len(ACTIONS):
+                    sock.sendall(error)
+                    continue
+                session = sessions.get(session_id)
+                if session is None:
+                    sock.sendall(error)
+                    continue
+                with session.lock:
+                    env = session.env
+                    if op == b"S":
+                        env.send_action(arg)
+                        state = env.get_state()
+                        reply = encode_reply(env, state, env.compute_reward(session.prev_state, state))
+                    elif op in (b"R", b"B"):
+                        if op == b"R":
+                            session.prev_state = env.reset()
+                        state = session.prev_state
+                        reply = encode_reply(env, state, 0.0)
+                    else:
+                        reply = error
+                        state = session.prev_state
+                    session.prev_state = state
+                sock.sendall(reply)
+            except (ConnectionError, OSError):
+                return
+
+
+class StreamServer(socketserver.ThreadingTCPServer):
+    """Socket endpoint stepping the sessions of a :class:`SessionManager`.
+
+    Each connection handles one request at a time and starts out bound to
+    ``default_session``.
+    """
+
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], sessions: SessionManager, default_session: str) -> None:
+        super().__init__(address, _StreamHandler)
+        self.sessions = sessions
+        self.default_session = default_session
+
+
 # === Simple manual test ====================================================
 # === HTTP interface ========================================================
 if __name__ == "__main__":
-    from flask import Flask, request, jsonify
+    import io
+    from flask import Flask, Response, abort, make_response, request, jsonify
 
     app = Flask(__name__)
 
-    ENV = SimEnv()
-    PREV_STATE = ENV.reset()
+    # The routes without a session id operate on this session.
+    DEFAULT_SESSION = "default"
+    SESSIONS = SessionManager()
+    SESSIONS.add(SimEnv(), DEFAULT_SESSION, persistent=True)
 
-    @app.post("/load_map")
-    def load_map():
-        """Load a new CSV map and reset the simulator."""
-        global ENV, PREV_STATE
-        data = request.get_json(force=True)
-        fname = data.get("file")
+    def lookup(session_id: str) -> Session:
+        session = SESSIONS.get(session_id)
+        if session is None:
+            abort(make_response(jsonify({"error": "unknown session"}), 404))
+        return session
+
+    def map_path(fname: Optional[str]) -> str:
+        """Resolve a map file name relative to this directory."""
         if not fname:
-            return jsonify({"error": "missing file"}), 400
+            abort(make_response(jsonify({"error": "missing file"}), 400))
         path = os.path.join(os.path.dirname(__file__), fname)
         if not os.path.exists(path):
-            return jsonify({"error": "not found"}), 404
-        ENV = SimEnv(path)
-        PREV_STATE = ENV.reset()
-        return jsonify(map_name=ENV.map_name)
+            abort(make_response(jsonify({"error": "not found"}), 404))
+        return path
+
+    @app.post("/sessions")
+    def create_session():
+        """Create a simulator session.
+
+        The body names the map ``file`` and may contain the :class:`SimEnv`
+        options ``lidar_rays``, ``lidar_range``, ``coalesce`` and ``tick``.
+        """
+        data = request.get_json(force=True)
+        path = map_path(data.get("file"))
+        options = {
+            k: data[k] for k in ("lidar_rays", "lidar_range", "coalesce", "tick") if k in data
+        }
+        session_id = SESSIONS.create(path, **options)
+        return jsonify(id=session_id, map_name=SESSIONS.get(session_id).env.map_name), 201
+
+    @app.get("/sessions")
+    def list_sessions():
+        """List all sessions with their map and idle time in seconds."""
+        now = time.monotonic()
+        return jsonify([
+            {"id": sid, "map_name": s.env.map_name, "idle": now - s.last_used}
+            for sid, s in list(SESSIONS.sessions.items())
+        ])
+
+    @app.delete("/sessions/<session_id>")
+    def delete_session(session_id):
+        if session_id == DEFAULT_SESSION or not SESSIONS.remove(session_id):
+            return jsonify({"error": "unknown session"}), 404
+        return "", 204
+
+    @app.post("/load_map")
+    @app.post("/sessions/<session_id>/load_map")
+    def load_map(session_id=DEFAULT_SESSION):
+        """Load a new CSV map and reset the simulator."""
+        session = lookup(session_id)
+        path = map_path(request.get_json(force=True).get("file"))
+        with session.lock:
+            session.load(SESSIONS.new_env(path, **session.options))
+            return jsonify(map_name=session.env.map_name)
 
     @app.post("/reset")
-    def reset():
+    @app.post("/sessions/<session_id>/reset")
+    def reset(session_id=DEFAULT_SESSION):
         """Reset the simulation and return the initial state."""
-        global PREV_STATE
-        PREV_STATE = ENV.reset()
-        return jsonify(
-            state=PREV_STATE,
-            reward=0.0,
-            done=ENV.done,
-            goal_reached=ENV.goal_reached,
-            crashed=ENV.car.crashed,
-            battery=ENV.car.battery,
-            coverage=ENV.coverage,
-            coverage_done=ENV.coverage_done,
-            stalled=ENV.stalled,
-            map_name=ENV.map_name,
+        session = lookup(session_id)
+        with session.lock:
+            env = session.env
+            session.prev_state = env.reset()
+            return jsonify(
+                state=session.prev_state,
+                reward=0.0,
+                done=env.done,
+                goal_reached=env.goal_reached,
+                crashed=env.car.crashed,
+                battery=env.car.battery,
+                coverage=env.coverage,
+                coverage_done=env.coverage_done,
+                stalled=env.stalled,
+                map_name=env.map_name,
+            )
+
+    def advance(session: Session, idx: int) -> dict:
+        """Apply one action and return the resulting step information."""
+        env = session.env
+        env.send_action(idx)
+        new_state = env.get_state()
+        reward = env.compute_reward(session.prev_state, new_state)
+        session.prev_state = new_state
+        return dict(
+            state=new_state,
+            reward=reward,
+            done=env.done,
+            goal_reached=env.goal_reached,
+            crashed=env.car.crashed,
+            battery=env.car.battery,
+            coverage=env.coverage,
+            coverage_done=env.coverage_done,
+            stalled=env.stalled,
         )
 
     @app.post("/step")
-    def step():
+    @app.post("/sessions/<session_id>/step")
+    def step(session_id=DEFAULT_SESSION):
         """Apply an action index and advance the simulation."""
-        global PREV_STATE
+        session = lookup(session_id)
         idx = int(request.json.get("action", 0))
-        print(f"Action received: {ACTIONS[idx]}")
-        ENV.send_action(idx)
-        new_state = ENV.get_state()
-        reward = ENV.compute_reward(PREV_STATE, new_state)
-        PREV_STATE = new_state
-        return jsonify(
-            state=new_state,
-            reward=reward,
-            done=ENV.done,
-            goal_reached=ENV.goal_reached,
-            crashed=ENV.car.crashed,
-            battery=ENV.car.battery,
-            coverage=ENV.coverage,
-            coverage_done=ENV.coverage_done,
-            stalled=ENV.stalled,
-            map_name=ENV.map_name,
+        if session_id == DEFAULT_SESSION:
+            print(f"Action received: {ACTIONS[idx]}")
+        with session.lock:
+            return jsonify(map_name=session.env.map_name, **advance(session, idx))
+
+    @app.post("/step_batch")
+    @app.post("/sessions/<session_id>/step_batch")
+    def step_batch(session_id=DEFAULT_SESSION):
+        """Apply several actions in one request.
+
+        The body either holds a list ``actions`` or a single ``action`` with
+        a ``repeat`` count.  Stepping stops early once the episode is done.
+        Each field of :func:`advance` is returned as a list with one entry per
+        executed step.  ``state``, ``reward`` and ``done`` are renamed to
+        ``states``, ``rewards`` and ``dones``; the other fields (``crashed``,
+        ``coverage``, ...) keep their names.
+        """
+        session = lookup(session_id)
+        data = request.get_json(force=True)
+        if "actions" in data:
+            actions = [int(a) for a in data["actions"]]
+        else:
+            actions = [int(data.get("action", 0))] * int(data.get("repeat", 1))
+        results: Dict[str, list] = {}
+        with session.lock:
+            for idx in actions:
+                for key, value in advance(session, idx).items():
+                    results.setdefault(key, []).append(value)
+                if session.env.done:
+                    break
+            return jsonify(
+                map_name=session.env.map_name,
+                steps=len(results.get("state", [])),
+                states=results.pop("state", []),
+                rewards=results.pop("reward", []),
+                dones=results.pop("done", []),
+                **results,
+            )
+
+    @app.post("/rollout")
+    @app.post("/sessions/<session_id>/rollout")
+    def rollout(session_id=DEFAULT_SESSION):
+        """Run whole episodes with a client supplied policy.
+
+        The request body is an ``.npz`` archive of the network weights in
+        ``get_weights()`` order (it may be empty for a random policy).  The
+        query parameters ``epsilon``, ``episodes``, ``max_steps``, ``seed``,
+        ``camera_step`` and ``factorized`` configure the rollout (see
+        :class:`DensePolicy`).  The response is an ``.npz`` archive
+        with the arrays returned by :func:`run_episodes`.
+        """
+        session = lookup(session_id)
+        weights: List[np.ndarray] = []
+        if request.data:
+            with np.load(io.BytesIO(request.data)) as data:
+                weights = [data[f"arr_{i}"] for i in range(len(data.files))]
+        seed = request.args.get("seed")
+        policy = DensePolicy(
+            weights,
+            epsilon=float(request.args.get("epsilon", 0.0)),
+            seed=int(seed) if seed is not None else None,
+            camera_step=int(request.args.get("camera_step", 1)),
+            factorized=request.args.get("factorized", "0") in ("1", "true"),
+        )
+        with session.lock:
+            traj = run_episodes(
+                session.env,
+                policy,
+                episodes=int(request.args.get("episodes", 1)),
+                max_steps=int(request.args.get("max_steps", 1000)),
+            )
+            session.prev_state = session.env.get_state()
+            map_name = session.env.map_name
+        buf = io.BytesIO()
+        np.savez(buf, **traj)
+        return Response(
+            buf.getvalue(),
+            mimetype="application/octet-stream",
+            headers={"X-Map-Name": map_name},
         )
 
     @app.get("/state")
-    def state():
+    @app.get("/sessions/<session_id>/state")
+    def state(session_id=DEFAULT_SESSION):
         """Return the current state without modifying the environment."""
-        return jsonify(state=ENV.get_state(), done=ENV.done)
+        session = lookup(session_id)
+        with session.lock:
+            return jsonify(state=session.env.get_state(), done=session.env.done)
 
+    stream = StreamServer(("127.0.0.1", 6001), SESSIONS, DEFAULT_SESSION)
+    threading.Thread(target=stream.serve_forever, daemon=True).start()
     print("Test environment server running on http://127.0.0.1:6000")
+    print("Binary step stream listening on tcp://127.0.0.1:6001")
     app.run(port=6000)
@@ -1 +1,3 @@
 from .TE import SimEnv
+from .vec_env import VecSimEnv
+from .env_pool import SimEnvPool
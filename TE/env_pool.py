@@ -0,0 +1,213 @@
+"""Pool of :class:`~TE.TE.SimEnv` workers running in separate processes.
+
+The physics of :mod:`TE.TE` is pure Python and bound to a single core.  The
+pool starts one process per environment and exchanges actions, observations,
+rewards and termination flags through shared memory arrays.  Only a few
+command bytes travel through the pipes, so the per-step overhead does not
+depend on the size of the observation.
+"""
+
+from __future__ import annotations
+
+import multiprocessing as mp
+import os
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+from .TE import SimEnv
+
+DEFAULT_MAPS = [
+    os.path.join(os.path.dirname(__file__), f"Level{i}.csv") for i in range(1, 5)
+]
+
+# Columns of the shared flag matrix
+FLAG_NAMES = ("goal_reached", "crashed", "stalled", "coverage_done", "battery_empty")
+
+_STEP = b"s"
+_RESET = b"r"
+_CLOSE = b"c"
+
+
+def _worker(conn, index, map_file, env_kwargs, buffers, state_size) -> None:
+    """Process main loop serving one environment of the pool."""
+    env = SimEnv(map_file, **env_kwargs)
+    actions, states, terminal, rewards, dones, flags = _views(buffers, state_size)
+    prev = env.reset()
+    states[index] = prev
+    conn.send_bytes(b"")
+    while True:
+        cmd = conn.recv_bytes()
+        if cmd == _STEP:
+            env.send_action(int(actions[index]))
+            new_state = env.get_state()
+            rewards[index] = env.compute_reward(prev, new_state)
+            dones[index] = env.done
+            flags[index] = [
+                env.goal_reached, env.car.crashed, env.stalled, env.coverage_done, env.car.battery <= 0
+            ]
+            if env.done:
+                terminal[index] = new_state
+                new_state = env.reset()
+            states[index] = new_state
+            prev = new_state
+        elif cmd == _RESET:
+            prev = env.reset()
+            states[index] = prev
+        elif cmd == _CLOSE:
+            break
+        conn.send_bytes(b"")
+    conn.close()
+
+
+def _views(buffers, state_size: int) -> Tuple[np.ndarray, ...]:
+    actions, states, terminal, rewards, dones, flags = buffers
+    return (
+        np.frombuffer(actions, dtype=np.int64),
+        np.frombuffer(states, dtype=np.float32).reshape(-1, state_size),
+        np.frombuffer(terminal, dtype=np.float32).reshape(-1, state_size),
+        np.frombuffer(rewards, dtype=np.float64),
+        np.frombuffer(dones, dtype=np.bool_),
+        np.frombuffer(flags, dtype=np.bool_).reshape(-1, len(FLAG_NAMES)),
+    )
+
+
+class SimEnvPool:
+    """Run ``num_workers`` :class:`SimEnv` instances in parallel processes.
+
+    Worker ``i`` simulates ``map_files[i % len(map_files)]``; further keyword
+    arguments are passed to :class:`SimEnv`.  The workers load their maps
+    through the compiled map cache, so workers on the same map share the
+    memory-mapped pages; pass ``map_cache=False`` to parse the CSV files
+    instead.  The batch API matches
+    :class:`~TE.vec_env.VecSimEnv`: finished environments are reset
+    automatically and their final observation is kept in
+    :attr:`terminal_states`.
+
+    ``context`` selects the multiprocessing start method.  The platform
+    default is ``fork`` on Linux, so create the pool before importing
+    libraries that start threads (e.g. TensorFlow) or pass ``"spawn"``.
+    """
+
+    def __init__(
+        self,
+        num_workers: int,
+        map_files: Optional[Sequence[str]] = None,
+        context: Optional[str] = None,
+        **env_kwargs,
+    ) -> None:
+        self.num_envs = num_workers
+        env_kwargs.setdefault("map_cache", True)
+        self.map_files = list(map_files or DEFAULT_MAPS)
+        self.state_size = 8 + env_kwargs.get("lidar_rays", 0)
+        ctx = mp.get_context(context)
+        n = num_workers
+        buffers = (
+            ctx.RawArray("b", n * 8),
+            ctx.RawArray("b", n * self.state_size * 4),
+            ctx.RawArray("b", n * self.state_size * 4),
+            ctx.RawArray("b", n * 8),
+            ctx.RawArray("b", n),
+            ctx.RawArray("b", n * len(FLAG_NAMES)),
+        )
+        (
+            self._actions,
+            self._states,
+            self._terminal,
+            self._rewards,
+            self._dones,
+            self._flags,
+        ) = _views(buffers, self.state_size)
+        self._conns = []
+        self._procs = []
+        for i in range(n):
+            parent, child = ctx.Pipe()
+            proc = ctx.Process(
+                target=_worker,
+                args=(child, i, self.map_files[i % len(self.map_files)], env_kwargs, buffers, self.state_size),
+                daemon=True,
+            )
+            proc.start()
+            child.close()
+            self._conns.append(parent)
+            self._procs.append(proc)
+        self._wait(range(n))
+        self.closed = False
+
+    # ------------------------------------------------------------------
+    def _send(self, cmd: bytes, indices) -> None:
+        for i in indices:
+            self._conns[i].send_bytes(cmd)
+
+    def _wait(self, indices) -> None:
+        for i in indices:
+            self._conns[i].recv_bytes()
+
+    # ------------------------------------------------------------------
+    def reset(self, mask: Optional[np.ndarray] = None) -> np.ndarray:
+        """Reset all environments (or those selected by ``mask``)."""
+        indices = range(self.num_envs) if mask is None else np.flatnonzero(mask)
+        self._send(_RESET, indices)
+        self._wait(indices)
+        return self._states.copy()
+
+    def step(self, actions: Sequence[int]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Apply one action per worker and return ``(states, rewards, dones)``."""
+        self._actions[:] = actions
+        indices = range(self.num_envs)
+        self._send(_STEP, indices)
+        self._wait(indices)
+        return self._states.copy(), self._rewards.copy(), self._dones.copy()
+
+    # ------------------------------------------------------------------
+    @property
+    def terminal_states(self) -> np.ndarray:
+        return self._terminal.copy()
+
+    @property
+    def goal_reached(self) -> np.ndarray:
+        return self._flags[:, 0].copy()
+
+    @property
+    def crashed(self) -> np.ndarray:
+        return self._flags[:, 1].copy()
+
+    @property
+    def stalled(self) -> np.ndarray:
+        return self._flags[:, 2].copy()
+
+    @property
+    def coverage_done(self) -> np.ndarray:
+        return self._flags[:, 3].copy()
+
+    @property
+    def battery_empty(self) -> np.ndarray:
+        return self._flags[:, 4].copy()
+
+    @property
+    def map_names(self) -> list:
+        """Map name of every worker."""
+        return [
+            os.path.splitext(os.path.basename(self.map_files[i % len(self.map_files)]))[0]
+            for i in range(self.num_envs)
+        ]
+
+    # ------------------------------------------------------------------
+    def close(self) -> None:
+        """Stop all worker processes."""
+        if self.closed:
+            return
+        for conn in self._conns:
+            try:
+                conn.send_bytes(_CLOSE)
+            except (BrokenPipeError, OSError):
+                pass
+        for proc in self._procs:
+            proc.join(timeout=5)
+        self.closed = True
+
+    def __enter__(self) -> "SimEnvPool":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
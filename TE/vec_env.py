@@ -0,0 +1,274 @@
+"""Vectorised headless simulator stepping many cars at once.
+
+:class:`VecSimEnv` mirrors the dynamics of :class:`~TE.TE.SimEnv` for ``N``
+independent cars.  Instead of one :class:`~TE.TE.Car` object per episode the
+whole fleet is stored in NumPy arrays and every physics step, sensor sweep and
+termination check is a single array operation.  All cars drive on the same
+read-only :class:`~TE.TE.GameMap`; they do not collide with each other.
+"""
+
+from __future__ import annotations
+
+import math
+import os
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+from .TE import ACTIONS, DRIVE_ACTIONS, Car, GameMap, SimEnv
+
+DEFAULT_MAP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Level1.csv")
+
+FORWARD, LEFT, RIGHT, BACKWARD = (
+    DRIVE_ACTIONS.index(d) for d in ("forward", "left", "right", "backward")
+)
+
+# Drive command index for every entry of ``ACTIONS``
+_ACTION_DRIVE = np.array([DRIVE_ACTIONS.index(d) for d, _a in ACTIONS])
+
+
+class VecSimEnv:
+    """Step ``num_envs`` cars on a shared map in lock step.
+
+    The simulation always runs on a simulated clock advancing by ``tick``
+    seconds per step.  Cars whose episode ended in :meth:`step` are reset
+    automatically; their last observation is kept in :attr:`terminal_states`
+    and the termination flags (:attr:`goal_reached`, :attr:`crashed`, ...)
+    describe the step that was just taken.
+    """
+
+    def __init__(
+        self,
+        num_envs: int,
+        map_file: str = DEFAULT_MAP,
+        game_map: Optional[GameMap] = None,
+        tick: float = 1 / 60,
+        lidar_rays: int = 0,
+        lidar_range: float = 150.0,
+        coalesce: bool = True,
+        map_cache: bool = False,
+    ) -> None:
+        self.num_envs = num_envs
+        self.map = game_map or GameMap.from_csv(map_file, coalesce=coalesce, cache=map_cache)
+        self.tick = tick
+        self.lidar_rays = lidar_rays
+        self.lidar_range = lidar_range
+        # Vehicle constants are taken from a template car so both simulators
+        # stay in sync.
+        self.params = Car(self.map)
+
+        n = num_envs
+        self.pos_x = np.zeros(n)
+        self.pos_y = np.zeros(n)
+        self.velocity = np.zeros(n)
+        self.acceleration = np.zeros(n)
+        self.rotation = np.zeros(n)
+        self.steering_angle = np.zeros(n)
+        self.speed = np.zeros(n)
+        self.rpm = np.zeros(n)
+        self.gyro = np.zeros(n)
+        self.battery = np.zeros(n)
+        self.sim_time = np.zeros(n)
+        self.last_move = np.zeros(n)
+        self.crashed = np.zeros(n, dtype=bool)
+        self.goal_reached = np.zeros(n, dtype=bool)
+        self.stalled = np.zeros(n, dtype=bool)
+        self.coverage_done = np.zeros(n, dtype=bool)
+        self.battery_empty = np.zeros(n, dtype=bool)
+        self.done = np.zeros(n, dtype=bool)
+        # Per-car visit bitmaps using generation counters like SimEnv
+        self._visited = np.zeros((n, self.map.rows, self.map.cols), dtype=np.uint16)
+        self._generation = np.zeros(n, dtype=np.int64)
+        self._visited_count = np.zeros(n, dtype=np.int64)
+        self._free = self.map.free_mask
+        self._free_cells = self.map.free_cells
+        self.coverage = np.zeros(n)
+        self.terminal_states = np.zeros((n, self.state_size), dtype=np.float32)
+
+    # ------------------------------------------------------------------
+    @property
+    def state_size(self) -> int:
+        return 8 + self.lidar_rays
+
+    # ------------------------------------------------------------------
+    def reset(self, mask: Optional[np.ndarray] = None) -> np.ndarray:
+        """Reset all cars (or those selected by ``mask``) and return states."""
+        if mask is None:
+            mask = np.ones(self.num_envs, dtype=bool)
+        self.pos_x[mask] = self.map.startX
+        self.pos_y[mask] = self.map.startY
+        self.velocity[mask] = 0.0
+        self.acceleration[mask] = 0.0
+        self.rotation[mask] = math.pi
+        self.steering_angle[mask] = 0.0
+        self.speed[mask] = 0.0
+        self.rpm[mask] = 0.0
+        self.gyro[mask] = 180.0
+        self.battery[mask] = 1.0
+        self.sim_time[mask] = 0.0
+        self.last_move[mask] = 0.0
+        self._generation[mask] += 1
+        wrapped = mask & (self._generation > np.iinfo(self._visited.dtype).max)
+        if wrapped.any():
+            self._visited[wrapped] = 0
+            self._generation[wrapped] = 1
+        self._visited_count[mask] = 0
+        self.coverage[mask] = 0.0
+        self._update_coverage(mask)
+        return self.get_state()
+
+    # ------------------------------------------------------------------
+    def step(self, actions: Sequence[int]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Apply one action index per car.
+
+        Returns ``(states, rewards, dones)`` with shapes ``(N, state_size)``,
+        ``(N,)`` and ``(N,)``.  States of finished cars already belong to
+        their next episode.
+        """
+        drive = _ACTION_DRIVE[np.asarray(actions, dtype=np.int64)]
+        self._update_cars(drive)
+        self._update_coverage(np.ones(self.num_envs, dtype=bool))
+
+        moving = self.speed > 0
+        self.last_move = np.where(moving, self.sim_time, self.last_move)
+        self.stalled = ~moving & (self.sim_time - self.last_move > SimEnv.STALL_TIMEOUT)
+        self.goal_reached = self._at_target()
+        self.coverage_done = self.coverage >= 0.95
+        self.battery_empty = self.battery <= 0
+        self.done = (
+            self.stalled
+            | self.goal_reached
+            | self.crashed
+            | self.coverage_done
+            | self.battery_empty
+        )
+
+        rewards = np.select(
+            [self.goal_reached, self.crashed, self.stalled, self.coverage_done],
+            [100.0, -10.0, -5.0, 10.0],
+            default=-0.1,
+        )
+        states = self.get_state()
+        dones = self.done.copy()
+        if dones.any():
+            self.terminal_states[dones] = states[dones]
+            states = self.reset(dones)
+        return states, rewards, dones
+
+    # ------------------------------------------------------------------
+    def get_state(self) -> np.ndarray:
+        """Return the ``(N, state_size)`` observation matrix."""
+        rotation = self.rotation[:, np.newaxis]
+        fx = self.pos_x + self.params.hitbox_width / 2
+        fy = self.pos_y + self.params.hitbox_height / 2
+        sensors = rotation + np.array([math.pi, math.pi / 2, -math.pi / 2])
+        columns = [
+            self.map.cast_rays_batch(fx, fy, sensors, self.params.sensor_range),
+            np.stack([self.speed, self.gyro, self.rpm, self.coverage, self.battery], axis=1),
+        ]
+        if self.lidar_rays:
+            step = 2 * math.pi / self.lidar_rays
+            fan = rotation + math.pi + step * np.arange(self.lidar_rays)
+            columns.append(self.map.cast_rays_batch(fx, fy, fan, self.lidar_range))
+        return np.concatenate(columns, axis=1).astype(np.float32)
+
+    # ------------------------------------------------------------------
+    def _bounding_box(self, x: np.ndarray, y: np.ndarray, rotation: np.ndarray) -> Tuple[np.ndarray, ...]:
+        hw = self.params.hitbox_width / 2
+        hh = self.params.hitbox_height / 2
+        cx = x + hw
+        cy = y + hh
+        cos = np.cos(rotation)
+        sin = np.sin(rotation)
+        xs = [cx + (dx * cos - dy * sin) for dx, dy in ((-hw, -hh), (hw, -hh), (hw, hh), (-hw, hh))]
+        ys = [cy + (dx * sin + dy * cos) for dx, dy in ((-hw, -hh), (hw, -hh), (hw, hh), (-hw, hh))]
+        min_x = np.minimum.reduce(xs)
+        min_y = np.minimum.reduce(ys)
+        return min_x, min_y, np.maximum.reduce(xs) - min_x, np.maximum.reduce(ys) - min_y
+
+    def _in_bounds(self, x: np.ndarray, y: np.ndarray, w: np.ndarray, h: np.ndarray) -> np.ndarray:
+        m = self.map.margin
+        return (
+            (x >= m)
+            & (y >= m)
+            & (x + w <= self.map.width - m)
+            & (y + h <= self.map.height - m)
+        )
+
+    # ------------------------------------------------------------------
+    def _update_cars(self, drive: np.ndarray) -> None:
+        """Array version of :meth:`Car.update` for driving commands."""
+        p = self.params
+        self.sim_time += self.tick
+        throttle = (drive == FORWARD) | (drive == LEFT) | (drive == RIGHT)
+        brake = np.where(
+            self.velocity > 0,
+            -p.decel_rate,
+            np.where(self.velocity < 0, p.decel_rate, 0.0),
+        )
+        acceleration = np.where(
+            throttle, p.accel_rate, np.where(drive == BACKWARD, -p.accel_rate, brake)
+        )
+
+        steer = self.steering_angle
+        centred = np.where(
+            steer > 0,
+            np.maximum(0.0, steer - p.steer_rate),
+            np.where(steer < 0, np.minimum(0.0, steer + p.steer_rate), steer),
+        )
+        self.steering_angle = np.where(
+            drive == LEFT,
+            np.maximum(-p.max_steering, steer - p.steer_rate),
+            np.where(drive == RIGHT, np.minimum(p.max_steering, steer + p.steer_rate), centred),
+        )
+
+        velocity = np.clip(self.velocity + acceleration, -p.max_speed, p.max_speed)
+        coasting = (np.abs(velocity) < 0.01) & (drive != FORWARD) & (drive != BACKWARD)
+        velocity = np.where(coasting, 0.0, velocity)
+        rot_change = np.where(
+            velocity != 0, (velocity / p.wheel_base) * np.tan(self.steering_angle), 0.0
+        )
+        new_rot = self.rotation + rot_change
+        front_rot = self.rotation + math.pi
+        nx = self.pos_x + np.cos(front_rot) * velocity
+        ny = self.pos_y + np.sin(front_rot) * velocity
+        bbox = self._bounding_box(nx, ny, new_rot)
+        ok = self._in_bounds(*bbox) & ~self.map.collides_batch(*bbox)
+
+        self.pos_x = np.where(ok, nx, self.pos_x)
+        self.pos_y = np.where(ok, ny, self.pos_y)
+        self.rotation = np.where(ok, new_rot, self.rotation)
+        self.velocity = np.where(ok, velocity, 0.0)
+        self.acceleration = np.where(ok, acceleration, 0.0)
+        self.crashed = ~ok
+
+        self.speed = np.abs(self.velocity * 60)
+        self.rpm = np.abs((self.velocity / p.max_speed) * p.max_rpm)
+        self.gyro = (np.degrees(self.rotation) % 360 + 360) % 360
+        self.battery = np.maximum(0.0, self.battery - self.rpm * self.tick * p.BATTERY_RATE)
+
+    # ------------------------------------------------------------------
+    def _update_coverage(self, mask: np.ndarray) -> None:
+        cell_x = (self.pos_x / self.map.cell_size).astype(np.int64)
+        cell_y = (self.pos_y / self.map.cell_size).astype(np.int64)
+        mask = mask & (cell_x >= 0) & (cell_x < self.map.cols) & (cell_y >= 0) & (cell_y < self.map.rows)
+        idx = np.flatnonzero(mask)
+        cell_x, cell_y = cell_x[idx], cell_y[idx]
+        new = self._free[cell_y, cell_x] & (self._visited[idx, cell_y, cell_x] != self._generation[idx])
+        idx, cell_x, cell_y = idx[new], cell_x[new], cell_y[new]
+        self._visited[idx, cell_y, cell_x] = self._generation[idx]
+        self._visited_count[idx] += 1
+        self.coverage[idx] = self._visited_count[idx] / self._free_cells
+
+    # ------------------------------------------------------------------
+    def _at_target(self) -> np.ndarray:
+        target = self.map.target
+        if not target:
+            return np.zeros(self.num_envs, dtype=bool)
+        x, y, w, h = self._bounding_box(self.pos_x, self.pos_y, self.rotation)
+        return ~(
+            (x + w < target.x)
+            | (x > target.x + target.size)
+            | (y + h < target.y)
+            | (y > target.y + target.size)
+        )
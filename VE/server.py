@@ -8,12 +8,15 @@ import os
 import json
 import math
 
+import numpy as np
+
 app = Flask(__name__, static_folder='static', template_folder='templates')
 
 # In-memory storage for maps and telemetry
 maps = {}
 control_action = None
 control_value = None
+control_camera = None
 telemetry_log = []
 latest_telemetry = None
 current_map = None
@@ -81,6 +84,65 @@ def save_seq_list(data):
         json.dump(data, f)
 
 
+class SlamMap:
+    """SLAM grid reported incrementally by the browser.
+
+    Cells hold 0 (unknown), 1 (free) or 2 (obstacle).  Every change bumps
+    :attr:`version` and stamps the changed cells with it, so clients can
+    fetch only the cells changed since their last request.  Known and
+    obstacle cells are counted on update which makes :attr:`coverage` O(1).
+    A map replacing an older one starts at a higher ``version`` with all
+    cells stamped, so deltas requested across the reset cover every cell.
+    """
+
+    def __init__(self, width, height, version=0):
+        self.width = width
+        self.height = height
+        self.cells = np.zeros(width * height, dtype=np.uint8)
+        self.stamps = np.full(width * height, version, dtype=np.uint32)
+        self.version = version
+        self.known = 0
+        self.obstacles = 0
+
+    def apply(self, index, value):
+        """Set ``cells[index] = value``; later duplicates win."""
+        index = np.asarray(index, dtype=np.int64)
+        value = np.asarray(value, dtype=np.int64)
+        if index.shape != value.shape or index.ndim != 1:
+            raise ValueError('index and value must be lists of equal length')
+        ok = (index >= 0) & (index < self.cells.size) & (value >= 0) & (value <= 2)
+        if not ok.all():
+            raise ValueError('cell index or value out of range')
+        # Keep the last update of every cell
+        _, last = np.unique(index[::-1], return_index=True)
+        keep = index.size - 1 - last
+        index, value = index[keep], value[keep]
+        old = self.cells[index]
+        changed = old != value
+        if not changed.any():
+            return
+        index, value, old = index[changed], value[changed], old[changed]
+        self.known += int(np.count_nonzero(value) - np.count_nonzero(old))
+        self.obstacles += int(np.count_nonzero(value == 2) - np.count_nonzero(old == 2))
+        self.version += 1
+        self.cells[index] = value
+        self.stamps[index] = self.version
+
+    @property
+    def coverage(self):
+        """Share of the non-obstacle cells that are known to be free."""
+        total = self.cells.size - self.obstacles
+        return (self.known - self.obstacles) / total if total else 0.0
+
+    def changes_since(self, version):
+        """Return ``(index, value)`` lists of cells changed after ``version``."""
+        index = np.flatnonzero(self.stamps > version)
+        return index.tolist(), self.cells[index].tolist()
+
+    def to_list(self):
+        return self.cells.reshape(self.height, self.width).tolist()
+
+
 def map_to_grid(map_data):
     cols = map_data.get('cols')
     rows = map_data.get('rows')
@@ -371,7 +433,7 @@ def map_detail(map_id):
 
 @app.route('/api/control', methods=['GET', 'POST'])
 def control():
-    global control_action, control_value
+    global control_action, control_value, control_camera
     if request.method == 'POST':
         data = request.get_json(force=True)
         control_action = data.get('action')
@@ -380,11 +442,16 @@ def control():
     else:
         action = control_action
         value = control_value
+        camera = control_camera
         control_action = None
         control_value = None
-        if value is None:
-            return jsonify({'action': action})
-        return jsonify({'action': action, 'value': value})
+        control_camera = None
+        result = {'action': action}
+        if value is not None:
+            result['value'] = value
+        if camera is not None:
+            result['camera'] = camera
+        return jsonify(result)
 
 @app.route('/api/car', methods=['GET', 'POST'])
 def car():
@@ -422,6 +489,51 @@ def waypoint():
     return jsonify({'reached': reached})
 
 
+def slam_coverage():
+    """Return the explored share of the SLAM map reported by the browser."""
+    if current_slam_map is None:
+        return 0.0
+    return current_slam_map.coverage
+
+
+@app.route('/api/step', methods=['GET', 'POST'])
+def step():
+    """Combined control command and observation for the RL agent.
+
+    A POST may contain a driving ``action`` (with optional ``value``) and a
+    ``camera`` angle which are queued for the browser together.  Both
+    methods return the latest telemetry, the coverage and the goal and
+    waypoint flags; reading the flags clears them like ``/api/goal`` does.
+    """
+    global control_action, control_value, control_camera
+    global goal_reached, waypoint_reached
+    if request.method == 'POST':
+        data = request.get_json(force=True)
+        if 'action' in data:
+            control_action = data.get('action')
+            control_value = data.get('value')
+        if data.get('camera') is not None:
+            control_camera = data['camera']
+    telemetry = latest_telemetry or {}
+    dist = telemetry.get('distances') or {}
+    result = {
+        'state': [
+            dist.get('front', 0),
+            dist.get('left', 0),
+            dist.get('right', 0),
+            telemetry.get('speed', 0),
+            telemetry.get('gyro', 0),
+            telemetry.get('rpm', 0),
+        ],
+        'coverage': slam_coverage(),
+        'goal': goal_reached,
+        'waypoint': waypoint_reached,
+    }
+    goal_reached = False
+    waypoint_reached = False
+    return jsonify(result)
+
+
 @app.route('/api/grid')
 def grid():
     if current_grid is None:
@@ -439,8 +551,45 @@ def grid_geo():
     return jsonify(geo)
 
 
-@app.route('/api/slam-map')
+@app.route('/api/slam-map', methods=['GET', 'POST'])
 def slam_map():
+    """SLAM grid updates from the browser and queries from clients.
+
+    A POST carries ``width``, ``height`` and the changed cells as parallel
+    ``index``/``value`` lists; ``reset`` starts a fresh map.  Changes without
+    ``reset`` are rejected with 409 if the server has no map of that size.
+    A GET with ``?since=<version>`` returns only the cells changed after
+    that version, otherwise the whole grid.
+    """
+    global current_slam_map
+    if request.method == 'POST':
+        data = request.get_json(force=True)
+        try:
+            width = int(data.get('width', 0))
+            height = int(data.get('height', 0))
+        except (TypeError, ValueError):
+            return jsonify({'error': 'invalid size'}), 400
+        if width <= 0 or height <= 0:
+            return jsonify({'error': 'invalid size'}), 400
+        if (
+            data.get('reset')
+            or current_slam_map is None
+            or (current_slam_map.width, current_slam_map.height) != (width, height)
+        ):
+            if not data.get('reset'):
+                # Changes to a map the server does not have (e.g. after a
+                # restart); the client has to send the full map again
+                return jsonify({'error': 'no matching map, send a reset'}), 409
+            version = current_slam_map.version + 1 if current_slam_map else 0
+            current_slam_map = SlamMap(width, height, version)
+        try:
+            current_slam_map.apply(data.get('index', []), data.get('value', []))
+        except (TypeError, ValueError) as e:
+            return jsonify({'error': str(e)}), 400
+        return jsonify({
+            'version': current_slam_map.version,
+            'coverage': current_slam_map.coverage,
+        })
     if current_slam_map is None:
         # default simple map: return current_grid if available
         if current_grid is None:
@@ -449,9 +598,23 @@ def slam_map():
             h = len(current_grid)
             w = len(current_grid[0]) if h else 0
             return jsonify({'gridSize': {'width': w, 'height': h}, 'cells': current_grid})
-    h = len(current_slam_map)
-    w = len(current_slam_map[0]) if h else 0
-    return jsonify({'gridSize': {'width': w, 'height': h}, 'cells': current_slam_map})
+    result = {
+        'gridSize': {'width': current_slam_map.width, 'height': current_slam_map.height},
+        'version': current_slam_map.version,
+    }
+    since = request.args.get('since', type=int)
+    if since is not None and 0 <= since <= current_slam_map.version:
+        index, value = current_slam_map.changes_since(since)
+        result.update({'since': since, 'index': index, 'value': value})
+    else:
+        result['cells'] = current_slam_map.to_list()
+    return jsonify(result)
+
+
+@app.route('/api/slam-coverage')
+def slam_coverage_route():
+    """Explored share of the SLAM map as a single number."""
+    return jsonify({'coverage': slam_coverage()})
 
 
 @app.route('/api/rl-log')
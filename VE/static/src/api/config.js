@@ -2,3 +2,4 @@
 // without any additional configuration.
 export const CONTROL_API_URL = '/api/control';
 export const TELEMETRY_API_URL = '/api/car';
+export const SLAM_API_URL = '/api/slam-map';
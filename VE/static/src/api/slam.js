@@ -0,0 +1,79 @@
+import { SLAM_API_URL } from './config.js';
+
+// Cell values shared with the server: 0=unknown, 1=free, 2=obstacle
+export const UNKNOWN = 0;
+export const FREE = 1;
+export const OBSTACLE = 2;
+
+// Classify the cells of the SLAM overlay. A cell counts as explored when the
+// fog at its centre pixel was cleared.
+export function cellsFromImage(data, width, cellSize, cols, rows, obstacles = []) {
+  const cells = new Uint8Array(cols * rows);
+  for (let r = 0; r < rows; r++) {
+    const py = Math.floor(r * cellSize + cellSize / 2);
+    for (let c = 0; c < cols; c++) {
+      const px = Math.floor(c * cellSize + cellSize / 2);
+      if (data[(py * width + px) * 4 + 3] === 0) cells[r * cols + c] = FREE;
+    }
+  }
+  for (const o of obstacles) {
+    const startX = Math.floor(o.x / cellSize);
+    const startY = Math.floor(o.y / cellSize);
+    const size = Math.max(1, Math.floor(o.size / cellSize));
+    for (let dy = 0; dy < size; dy++) {
+      for (let dx = 0; dx < size; dx++) {
+        const x = startX + dx;
+        const y = startY + dy;
+        if (x >= 0 && x < cols && y >= 0 && y < rows) cells[y * cols + x] = OBSTACLE;
+      }
+    }
+  }
+  return cells;
+}
+
+// Keeps the last state sent to the server and posts only changed cells.
+export class SlamSync {
+  constructor(cols, rows) {
+    this.cols = cols;
+    this.rows = rows;
+    this.cells = new Uint8Array(cols * rows);
+    this.reset = true;
+  }
+
+  diff(cells) {
+    const index = [];
+    const value = [];
+    for (let i = 0; i < cells.length; i++) {
+      if (cells[i] !== this.cells[i]) {
+        index.push(i);
+        value.push(cells[i]);
+        this.cells[i] = cells[i];
+      }
+    }
+    return { index, value };
+  }
+
+  send(cells) {
+    const { index, value } = this.diff(cells);
+    if (!index.length && !this.reset) return null;
+    const body = { width: this.cols, height: this.rows, index, value };
+    if (this.reset) body.reset = true;
+    this.reset = false;
+    return fetch(SLAM_API_URL, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify(body),
+    })
+      .then((res) => {
+        if (!res.ok) throw new Error(`HTTP ${res.status}`);
+        return res;
+      })
+      .catch((err) => {
+        // The server may have missed the changes (or lost its map after a
+        // restart); send the full map again with the next update
+        this.cells.fill(UNKNOWN);
+        this.reset = true;
+        console.error('slam sync failed', err);
+      });
+  }
+}
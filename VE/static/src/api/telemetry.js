@@ -6,6 +6,7 @@ export async function pollControl(car) {
     if (!res.ok) return;
     const data = await res.json();
     if (data.action) car.setKeysFromAction(data.action, data.value);
+    if (typeof data.camera === 'number') car.setCamera2Angle(data.camera);
   } catch (err) {
     console.error('pollControl failed', err);
   }
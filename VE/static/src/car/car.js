@@ -156,16 +156,20 @@ export class Car {
       return;
     }
     if (action === 'camera2') {
-      if (typeof value === 'number') {
-        const deg = Math.max(-90, Math.min(90, value));
-        this.camera2Angle = (deg * Math.PI) / 180;
-      }
+      this.setCamera2Angle(value);
       return;
     }
     const key = this.actionMap[action];
     if (key) this.keys[key] = true;
   }
 
+  setCamera2Angle(value) {
+    if (typeof value === 'number') {
+      const deg = Math.max(-90, Math.min(90, value));
+      this.camera2Angle = (deg * Math.PI) / 180;
+    }
+  }
+
   drawBorder(canvasWidth, canvasHeight) {
     const m = this.margin;
     this.ctx.fillStyle = '#aaa';
@@ -13,6 +13,7 @@ import {
 } from './map/management.js';
 import * as db from './map/db.js';
 import { pollControl, sendTelemetry } from './api/telemetry.js';
+import { SlamSync, cellsFromImage } from './api/slam.js';
 import {
   loadSequences,
   runSequence,
@@ -51,6 +52,8 @@ let slamMode = false;
 let prevCarRect = null;
 // Store all hit locations so repeated scans do not remove markers
 const slamHits = [];
+// Sends changed SLAM cells to the server; recreated whenever the fog resets
+let slamSync = null;
 const saveMapCsvBtn = document.getElementById('saveMapCsv');
 const overwriteCsvBtn = document.getElementById('overwriteMapCsv');
 const connectCornersBtn = document.getElementById('connectCorners');
@@ -333,6 +336,7 @@ function resizeCanvas() {
     slamCtx.fillRect(0, 0, slamCanvas.width, slamCanvas.height);
     prevCarRect = null;
     slamHits.length = 0;
+    slamSync = null;
     revealCar();
     updateSlamCoverage();
   }
@@ -418,6 +422,17 @@ function updateSlamCoverage() {
   }
   const percent = total ? (cleared / total) * 100 : 0;
   slamCoverageEl.textContent = percent.toFixed(1) + '%';
+  if (!slamSync) slamSync = new SlamSync(gameMap.cols, gameMap.rows);
+  slamSync.send(
+    cellsFromImage(
+      data,
+      slamCanvas.width,
+      CELL_SIZE,
+      gameMap.cols,
+      gameMap.rows,
+      gameMap.obstacles,
+    ),
+  );
   const pts = Math.floor(percent);
   if (pts !== coverageScore) {
     score += pts - coverageScore;
@@ -878,6 +893,7 @@ function loadMapByIndex(idx) {
       slamCtx.fillRect(0, 0, slamCanvas.width, slamCanvas.height);
       prevCarRect = null;
       slamHits.length = 0;
+      slamSync = null;
       revealCar();
       updateSlamCoverage();
     }
@@ -908,6 +924,7 @@ function resetMap() {
     slamCtx.fillRect(0, 0, slamCanvas.width, slamCanvas.height);
     prevCarRect = null;
     slamHits.length = 0;
+    slamSync = null;
     revealCar();
     updateSlamCoverage();
   }
@@ -1015,6 +1032,7 @@ if (slamCheckbox) {
       slamCtx.fillRect(0, 0, slamCanvas.width, slamCanvas.height);
       prevCarRect = null;
       slamHits.length = 0;
+      slamSync = null;
       revealCar();
       if (coverageInterval) clearInterval(coverageInterval);
       coverageInterval = setInterval(updateSlamCoverage, 1000);
@@ -1026,6 +1044,7 @@ if (slamCheckbox) {
       slamCtx.clearRect(0, 0, slamCanvas.width, slamCanvas.height);
       prevCarRect = null;
       slamHits.length = 0;
+      slamSync = null;
       if (coverageInterval) clearInterval(coverageInterval);
       if (slamCoverageEl) slamCoverageEl.textContent = '0%';
       coverageScore = 0;
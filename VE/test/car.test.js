@@ -33,3 +33,11 @@ test('pressing left or right moves forward', () => {
   car.update(800, 600);
   assert.equal(car.velocity, car.accelRate);
 });
+
+test('camera angle can be set without releasing drive keys', () => {
+  const car = new Car({}, {}, 1, 10, []);
+  car.setKeysFromAction('forward');
+  car.setCamera2Angle(120);
+  assert.equal(car.keys.ArrowUp, true);
+  assert.equal(car.camera2Angle, Math.PI / 2);
+});
@@ -0,0 +1,52 @@
+import test from 'node:test';
+import assert from 'node:assert/strict';
+import { SlamSync, cellsFromImage, FREE, OBSTACLE, UNKNOWN } from '../static/src/api/slam.js';
+
+test('cellsFromImage marks cleared and obstacle cells', () => {
+  // 2x1 cells of 2px each; only the first cell's centre is transparent
+  const data = new Uint8ClampedArray(4 * 2 * 4).fill(255);
+  data[(1 * 4 + 1) * 4 + 3] = 0;
+  const cells = cellsFromImage(data, 4, 2, 2, 1, [{ x: 2, y: 0, size: 2 }]);
+  assert.deepEqual(Array.from(cells), [FREE, OBSTACLE]);
+});
+
+test('SlamSync posts only changed cells', async () => {
+  const bodies = [];
+  global.fetch = async (url, opts) => {
+    bodies.push(JSON.parse(opts.body));
+    return { ok: true };
+  };
+  const sync = new SlamSync(3, 1);
+  await sync.send(Uint8Array.from([FREE, UNKNOWN, UNKNOWN]));
+  assert.equal(sync.send(Uint8Array.from([FREE, UNKNOWN, UNKNOWN])), null);
+  await sync.send(Uint8Array.from([FREE, UNKNOWN, OBSTACLE]));
+  assert.deepEqual(bodies, [
+    { width: 3, height: 1, index: [0], value: [FREE], reset: true },
+    { width: 3, height: 1, index: [2], value: [OBSTACLE] },
+  ]);
+});
+
+test('SlamSync resends the full map after an error response', async () => {
+  const bodies = [];
+  const statuses = [200, 409, 200];
+  global.fetch = async (url, opts) => {
+    bodies.push(JSON.parse(opts.body));
+    const status = statuses.shift();
+    return { ok: status < 400, status };
+  };
+  const origError = console.error;
+  console.error = () => {};
+  try {
+    const sync = new SlamSync(3, 1);
+    await sync.send(Uint8Array.from([FREE, UNKNOWN, UNKNOWN]));
+    await sync.send(Uint8Array.from([FREE, FREE, UNKNOWN]));
+    await sync.send(Uint8Array.from([FREE, FREE, UNKNOWN]));
+  } finally {
+    console.error = origError;
+  }
+  assert.deepEqual(bodies, [
+    { width: 3, height: 1, index: [0], value: [FREE], reset: true },
+    { width: 3, height: 1, index: [1], value: [FREE] },
+    { width: 3, height: 1, index: [0, 1], value: [FREE, FREE], reset: true },
+  ]);
+});